@@ -0,0 +1,149 @@
+"""Admission control in front of the backend: per-IP/per-email rate limits and per-route concurrency caps.
+
+Everything is in memory and bounded, and requests are rejected before any
+upstream call is made.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import request
+
+import metrics
+
+# Most keys (IPs/hashed emails) remembered per limiter; the least recently seen are evicted
+ADMISSION_MAX_KEYS = int(os.getenv('ADMISSION_MAX_KEYS', 10000))
+# Upstream calls allowed in flight per route per worker before new ones get a 503
+UPSTREAM_ROUTE_CONCURRENCY = int(os.getenv('UPSTREAM_ROUTE_CONCURRENCY', 100))
+
+REJECTIONS = metrics.Counter('admission_rejections_total', 'Requests rejected before reaching the backend',
+                             ('route', 'reason'))
+
+
+class Rejected(Exception):
+    status_code = 429
+    message = 'Too many requests, please try again later.'
+
+    def __init__(self, retry_after):
+        super().__init__(self.message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RateLimited(Rejected):
+    status_code = 429
+
+
+class Overloaded(Rejected):
+    status_code = 503
+    message = 'Server busy, please try again shortly.'
+
+
+def parse_rate(spec):
+    """'10/60' -> (10, 60.0): 10 requests per 60 seconds"""
+    count, _, period = spec.partition('/')
+    return int(count), float(period or 60)
+
+
+class TokenBucketLimiter:
+    """One token bucket per key, refilled continuously; memory capped at `max_keys` buckets"""
+
+    def __init__(self, capacity, period, max_keys=ADMISSION_MAX_KEYS):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        """Take a token for `key`; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0
+            else:
+                retry_after = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def _limiters(prefix, ip_default, email_default):
+    return {
+        'ip': TokenBucketLimiter(*parse_rate(os.getenv(f'ADMISSION_{prefix}_IP_LIMIT', ip_default))),
+        'email': TokenBucketLimiter(*parse_rate(os.getenv(f'ADMISSION_{prefix}_EMAIL_LIMIT', email_default))),
+    }
+
+
+RATE_LIMITS = {
+    'login': _limiters('LOGIN', '10/60', '5/60'),
+    'register': _limiters('REGISTER', '5/60', '3/60'),
+    'password-reset': _limiters('RESET', '5/60', '3/300'),
+}
+
+
+def email_key(email):
+    """Fixed-size limiter key for a client-supplied email, whatever its length"""
+    return hashlib.blake2b(email.strip().lower().encode('utf-8'), digest_size=16).digest()
+
+
+def check_rate_limits(policy, ip, email=None):
+    limiters = RATE_LIMITS[policy]
+    retry_after = limiters['ip'].hit(ip)
+    reason = 'ip'
+    if not retry_after and email:
+        retry_after = limiters['email'].hit(email)
+        reason = 'email'
+    if retry_after:
+        REJECTIONS.inc((policy, f'rate_{reason}'))
+        raise RateLimited(retry_after)
+
+
+def rate_limited(policy):
+    """Route decorator applying the per-IP and per-email limits of `policy`"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            body = request.get_json(silent=True)
+            email = body.get('email') if isinstance(body, dict) else None
+            email = email_key(email) if isinstance(email, str) and email.strip() else None
+            check_rate_limits(policy, request.remote_addr or 'unknown', email)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight upstream calls per route; excess is shed instead of queued"""
+
+    def __init__(self, limit=UPSTREAM_ROUTE_CONCURRENCY):
+        self.limit = limit
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, route):
+        with self._lock:
+            if self._in_flight.get(route, 0) >= self.limit:
+                REJECTIONS.inc((route, 'concurrency'))
+                raise Overloaded(1)
+            self._in_flight[route] = self._in_flight.get(route, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[route] -= 1
+
+
+upstream_concurrency = ConcurrencyLimiter()
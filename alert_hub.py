@@ -0,0 +1,253 @@
+"""In-process SSE fan-out: one upstream alert stream per credential, shared by every local client."""
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import upstream
+
+# Events buffered per browser before it is treated as a slow consumer and dropped
+ALERT_HUB_CLIENT_QUEUE = int(os.getenv('ALERT_HUB_CLIENT_QUEUE', 100))
+# Recent events kept per channel so reconnecting clients can resume from Last-Event-ID
+ALERT_HUB_BUFFER = int(os.getenv('ALERT_HUB_BUFFER', 200))
+# Seconds between keep-alive comments sent to idle clients
+ALERT_HUB_KEEPALIVE = float(os.getenv('ALERT_HUB_KEEPALIVE', 15))
+# Seconds to wait before reconnecting a failed upstream stream
+ALERT_HUB_RETRY = float(os.getenv('ALERT_HUB_RETRY', 5))
+# Seconds a channel keeps its upstream stream open after the last client leaves
+ALERT_HUB_IDLE_GRACE = float(os.getenv('ALERT_HUB_IDLE_GRACE', 30))
+
+SSE_ENDPOINT = '/api/sse/alerts'
+# Sent, without an id, to a client that resumed too far behind to replay everything it missed
+RELOAD_EVENT = json.dumps({"reload": True, "error": "Missed too many alerts, reload /api/alerts"})
+
+
+class Subscriber:
+    local = True
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=ALERT_HUB_CLIENT_QUEUE)
+        self.closed = False
+
+    def offer(self, item):
+        """Queue an event without blocking; returns False if the client is too slow"""
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.closed = True
+            return False
+
+
+class Channel:
+    """A single upstream subscription and the local clients reading from it"""
+
+    def __init__(self, hub, key, cookies):
+        self.hub = hub
+        self.key = key
+        self.cookies = cookies
+        self.subscribers = set()
+        self.buffer = deque(maxlen=ALERT_HUB_BUFFER)
+        # Millisecond-based ids stay increasing across channel restarts
+        self.next_id = int(time.time() * 1000)
+        self.lock = threading.Lock()
+        self.idle_since = None
+        self.relay_healthy = False
+        self.thread = threading.Thread(target=self._run, name=f'alert-hub-{key[:8]}', daemon=True)
+
+    def add(self, subscriber, last_event_id=None):
+        with self.lock:
+            if last_event_id is not None:
+                missed = [event for event in self.buffer if event[0] > last_event_id]
+                room = subscriber.queue.maxsize
+                if 0 < room < len(missed):
+                    # Too far behind to replay without overflowing the client's queue:
+                    # send the newest events that fit and tell it to reload the rest
+                    missed = missed[len(missed) - room + 1:]
+                    subscriber.offer((None, RELOAD_EVENT))
+                for event in missed:
+                    subscriber.offer(event)
+            if not subscriber.closed:
+                self.subscribers.add(subscriber)
+                self.idle_since = None
+            elif not self.subscribers and self.idle_since is None:
+                self.idle_since = time.monotonic()
+
+    def remove(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+            if not self.subscribers:
+                self.idle_since = time.monotonic()
+
+    def publish(self, payload, buffered=True, event_id=None):
+        with self.lock:
+            if buffered:
+                # Relayed events keep the leader worker's id so resumes work on any worker
+                if event_id is None:
+                    event_id = self.next_id
+                self.next_id = max(self.next_id, event_id + 1)
+                self.buffer.append((event_id, payload))
+            else:
+                event_id = None
+            for subscriber in list(self.subscribers):
+                if not subscriber.offer((event_id, payload)):
+                    print(f"⚠️ Dropping slow SSE client on channel {self.key[:8]}")
+                    self.subscribers.discard(subscriber)
+            if not self.subscribers and self.idle_since is None:
+                self.idle_since = time.monotonic()
+
+    def idle_expired(self):
+        with self.lock:
+            return self.idle_since is not None and time.monotonic() - self.idle_since > ALERT_HUB_IDLE_GRACE
+
+    def _run(self):
+        while True:
+            self._pump()
+            if self.hub.retire(self):
+                return
+
+    def _pump(self):
+        headers = {"Accept": "text/event-stream"}
+        while not self.idle_expired():
+            relay = self.hub.relay
+            if relay is not None and relay.following():
+                self._follow(relay)
+                continue
+            base_url = self.hub.base_url()
+            opened = False
+            try:
+                with upstream.upstream_request('GET', base_url, SSE_ENDPOINT, stream=True,
+                                               headers=headers, cookies=self.cookies, timeout=60) as resp:
+                    resp.raise_for_status()
+                    opened = True
+                    self.hub.notify(self.key, 'open')
+                    for data in iter_sse_data(resp):
+                        self.publish(data)
+                        self.hub.notify(self.key, 'alert', data)
+                        if self.idle_expired():
+                            break
+                self.hub.notify(self.key, 'close')
+            except Exception as e:
+                if opened:
+                    self.hub.notify(self.key, 'close')
+                print(f"SSE proxy error: {e}")
+                self.publish(json.dumps({"error": "SSE connection error, retrying..."}), buffered=False)
+                time.sleep(ALERT_HUB_RETRY)
+
+
+    def _follow(self, relay):
+        """Take events from the leader worker instead of opening an upstream stream"""
+        subscription = relay.follow('alerts', self.key, self.cookies, self._relayed)
+        if subscription is None:
+            time.sleep(relay.retry)
+            return
+        self.relay_healthy = True
+        self.hub.notify(self.key, 'open')
+        try:
+            while not self.idle_expired() and not subscription.lost.wait(1):
+                pass
+        finally:
+            subscription.close()
+            self.hub.notify(self.key, 'close')
+
+    def _relayed(self, item):
+        event_id, payload = item
+        self.publish(payload, buffered=event_id is not None, event_id=event_id)
+        if event_id is None:
+            # The leader lost its upstream stream; anything until the next event may be missing
+            if self.relay_healthy:
+                self.relay_healthy = False
+                self.hub.notify(self.key, 'close')
+            return
+        if not self.relay_healthy:
+            self.relay_healthy = True
+            self.hub.notify(self.key, 'open')
+        self.hub.notify(self.key, 'alert', payload)
+
+
+def iter_sse_data(resp):
+    """Yield the data field of each event in an upstream SSE response as it arrives"""
+    pending = b''
+    data_lines = []
+    while True:
+        chunk = resp.raw.read1(8192)
+        if not chunk:
+            return
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            line = line.rstrip(b'\r')
+            if not line:
+                if data_lines:
+                    yield '\n'.join(data_lines)
+                    data_lines = []
+            elif line.startswith(b'data:'):
+                data_lines.append(line[5:].lstrip(b' ').decode('utf-8'))
+
+
+def format_event(event_id, payload):
+    """Serialise a hub event for the browser"""
+    lines = ''.join(f"data: {line}\n" for line in payload.split('\n'))
+    if event_id is None:
+        return f"{lines}\n"
+    return f"id: {event_id}\n{lines}\n"
+
+
+class AlertHub:
+    def __init__(self, base_url_func):
+        self.base_url = base_url_func
+        self.channels = {}
+        self.lock = threading.Lock()
+        # Called as listener(key, event, data=None) with event 'open', 'alert' or 'close'
+        self.listeners = []
+        # worker_bus.Relay when upstream streams are shared between gunicorn workers
+        self.relay = None
+
+    def notify(self, key, event, data=None):
+        for listener in self.listeners:
+            try:
+                listener(key, event, data)
+            except Exception as e:
+                print(f"Alert hub listener error: {e}")
+
+    def subscribe(self, key, cookies, last_event_id=None, subscriber=None):
+        """Register a client, starting the upstream stream for `key` if needed"""
+        if subscriber is None:
+            subscriber = Subscriber()
+        with self.lock:
+            channel = self.channels.get(key)
+            if channel is None:
+                channel = self.channels[key] = Channel(self, key, cookies)
+                channel.thread.start()
+            channel.add(subscriber, last_event_id)
+        return channel, subscriber
+
+    def stream(self, key, cookies, last_event_id=None):
+        """Generator of formatted SSE frames for one browser connection"""
+        channel, subscriber = self.subscribe(key, cookies, last_event_id)
+        try:
+            while not subscriber.closed:
+                try:
+                    event_id, payload = subscriber.queue.get(timeout=ALERT_HUB_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(event_id, payload)
+        finally:
+            channel.remove(subscriber)
+
+    def retire(self, channel):
+        """Drop an idle channel; returns False if a client joined in the meantime"""
+        with self.lock, channel.lock:
+            if channel.subscribers:
+                return False
+            if self.channels.get(channel.key) is channel:
+                del self.channels[channel.key]
+            return True
+
+    def client_count(self):
+        with self.lock:
+            return sum(1 for channel in self.channels.values() for subscriber in list(channel.subscribers)
+                       if subscriber.local)
@@ -0,0 +1,189 @@
+"""In-process alert history per credential/device, fed by `/api/alerts` and the SSE hub.
+
+Each history is indexed by alert id (for de-duplication) and kept sorted by
+timestamp then id, so `since`/`cursor` queries are a bisect away. A history
+only answers locally while it is known to be complete: right after a fetch of
+`/api/alerts`, or for as long as the upstream SSE stream that was open at that
+fetch stays connected. Anything else is a gap and goes upstream.
+"""
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# Alerts kept per credential/device; the oldest are dropped first
+ALERT_STORE_PER_DEVICE = int(os.getenv('ALERT_STORE_PER_DEVICE', 500))
+# Histories kept per worker; the least recently used are evicted
+ALERT_STORE_MAX_DEVICES = int(os.getenv('ALERT_STORE_MAX_DEVICES', 1000))
+# Seconds a fetched history is trusted without a live SSE stream keeping it current
+ALERT_STORE_SYNC_INTERVAL = float(os.getenv('ALERT_STORE_SYNC_INTERVAL', 5))
+DEFAULT_LIMIT = 50
+
+
+def parse_timestamp(value):
+    """Epoch seconds from an ISO 8601 string or a number; None if it can't be read"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if not math.isfinite(value):
+            return None
+        # Millisecond epochs are common in JS backends
+        return value / 1000.0 if value > 1e11 else float(value)
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return parse_timestamp(float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def sort_key(timestamp, alert_id):
+    """Ordering key for an alert: timestamp, then numeric ids as numbers ('9' before '49'), then other ids"""
+    if alert_id.isascii() and alert_id.isdigit():
+        return (timestamp, 0, int(alert_id), alert_id)
+    return (timestamp, 1, 0, alert_id)
+
+
+def format_cursor(key):
+    # repr() round-trips the float exactly, so the next page starts right after this alert
+    return f"{key[0]!r}:{key[-1]}"
+
+
+def parse_cursor(cursor):
+    """'1718000000.123456:42' -> the sort key of alert 42; raises ValueError if malformed"""
+    timestamp, sep, alert_id = cursor.partition(':')
+    if not sep:
+        raise ValueError(f"invalid cursor: {cursor!r}")
+    return sort_key(float(timestamp), alert_id)
+
+
+def alerts_from_body(body):
+    """The alert list in an `/api/alerts` body, whether bare or wrapped in {"alerts": [...]}"""
+    if isinstance(body, dict):
+        body = body.get('alerts')
+    if not isinstance(body, list):
+        return []
+    return [alert for alert in body if isinstance(alert, dict)]
+
+
+class AlertHistory:
+    def __init__(self):
+        self.by_id = {}
+        self.order = []  # sorted sort_key() tuples, alert id last
+        self.synced_at = None
+        self.stream_open_since = None
+
+    def add(self, alert):
+        alert_id = alert.get('id')
+        if alert_id is None:
+            # No id from the backend: identical payloads are the same alert
+            alert_id = json.dumps(alert, sort_keys=True)
+        alert_id = str(alert_id)
+        if alert_id in self.by_id:
+            return False
+        timestamp = parse_timestamp(alert.get('timestamp', alert.get('created_at')))
+        key = sort_key(time.time() if timestamp is None else timestamp, alert_id)
+        self.by_id[alert_id] = (key, alert)
+        bisect.insort(self.order, key)
+        while len(self.order) > ALERT_STORE_PER_DEVICE:
+            del self.by_id[self.order.pop(0)[-1]]
+        return True
+
+    def complete(self, now):
+        """True if nothing can have been missed since the last upstream fetch"""
+        if self.synced_at is None:
+            return False
+        if now - self.synced_at < ALERT_STORE_SYNC_INTERVAL:
+            return True
+        return self.stream_open_since is not None and self.stream_open_since <= self.synced_at
+
+    def query(self, since=None, cursor=None, limit=DEFAULT_LIMIT):
+        """Alerts after `cursor` (or at/after `since`), oldest first, and the cursor to resume from"""
+        if cursor is not None:
+            start = bisect.bisect_right(self.order, cursor)
+        elif since is not None:
+            start = bisect.bisect_left(self.order, (since,))
+        else:
+            start = max(0, len(self.order) - limit)
+        keys = self.order[start:start + limit]
+        alerts = [self.by_id[key[-1]][1] for key in keys]
+        if keys:
+            next_cursor = keys[-1]
+        elif cursor is not None:
+            next_cursor = cursor
+        elif self.order:
+            next_cursor = self.order[-1]
+        else:
+            next_cursor = None
+        return alerts, next_cursor
+
+
+class AlertStore:
+    def __init__(self, max_devices=ALERT_STORE_MAX_DEVICES):
+        self.max_devices = max_devices
+        self._histories = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _history(self, key):
+        # Caller holds the lock
+        history = self._histories.get(key)
+        if history is None:
+            history = self._histories[key] = AlertHistory()
+            while len(self._histories) > self.max_devices:
+                self._histories.popitem(last=False)
+        self._histories.move_to_end(key)
+        return history
+
+    def ingest(self, key, alerts, synced=False):
+        """Merge alerts into `key`'s history; `synced` marks a full upstream fetch"""
+        with self._lock:
+            history = self._history(key)
+            for alert in alerts:
+                history.add(alert)
+            if synced:
+                history.synced_at = time.monotonic()
+
+    def query(self, key, since=None, cursor=None, limit=DEFAULT_LIMIT, require_complete=True):
+        """(alerts, next_cursor) answered locally, or None when the history has a gap"""
+        with self._lock:
+            history = self._histories.get(key)
+            if history is None or (require_complete and not history.complete(time.monotonic())):
+                return None
+            self._histories.move_to_end(key)
+            return history.query(since, cursor, limit)
+
+    def on_stream(self, key, event, data=None):
+        """AlertHub listener: tracks upstream stream state and stores streamed alerts"""
+        with self._lock:
+            if event == 'open':
+                self._history(key).stream_open_since = time.monotonic()
+            elif event == 'close':
+                history = self._histories.get(key)
+                if history is not None:
+                    history.stream_open_since = None
+        if event == 'alert':
+            try:
+                alert = json.loads(data)
+            except ValueError:
+                return
+            if isinstance(alert, dict):
+                self.ingest(key, [alert])
+
+    def discard(self, credential):
+        """Forget every history belonging to `credential` (logout, session expiry)"""
+        prefix = f"{credential}:"
+        with self._lock:
+            for key in [key for key in self._histories if key.startswith(prefix)]:
+                del self._histories[key]
+
+    def __len__(self):
+        return len(self._histories)
@@ -1,29 +1,59 @@
 import os
 import time
-from flask import Flask, request, jsonify, redirect, send_from_directory, render_template, Response, session
+IMPORT_STARTED = time.perf_counter()
+import hashlib
+import threading
+import json
+from flask import Flask, request, jsonify, redirect, send_from_directory, render_template, Response, session, g, copy_current_request_context
 import requests
 from flask_cors import CORS, cross_origin
 from dotenv  import load_dotenv
 import logging
 from typing import Optional
+import upstream
+import backends
+from alert_hub import AlertHub
+import alert_store
+from response_cache import ResponseCache
+from status_stream import StatusStreamHub
+import request_log
+import metrics
+import admission
+import auth_gate
+import assets
+import worker_bus
+import traffic_recorder
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor, wait
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, filename='login_attempts.log')
+# Configure logging (file writes happen on a background listener thread)
+request_log.setup_logging('login_attempts.log')
+upstream_log = request_log.RequestLog()
 
-app = Flask(__name__, static_url_path='/static')
+# Static files are served by serve_static below (fingerprinted, precompressed)
+app = Flask(__name__, static_folder=None)
 CORS(app, supports_credentials=True)
 
+# Number of reverse proxies (e.g. Render's router) in front of the app whose
+# X-Forwarded-For can be trusted for the client IP used by rate limiting
+PROXY_FIX_HOPS = int(os.getenv('PROXY_FIX_HOPS', 0))
+if PROXY_FIX_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_FIX_HOPS, x_proto=PROXY_FIX_HOPS)
+
 # Flask Configuration with Secure Session Management
 app.config.update(
     SECRET_KEY=os.environ.get('FLASK_SECRET_KEY', 'fallback-secret-key-change-in-production'),
-    SESSION_COOKIE_SECURE=True,      # Only send cookie over HTTPS
+    SESSION_COOKIE_SECURE=os.getenv('SESSION_COOKIE_SECURE', 'true').lower() == 'true',  # Only send cookie over HTTPS
     SESSION_COOKIE_HTTPONLY=True,    # Prevent JavaScript access to cookie
     SESSION_COOKIE_SAMESITE='Lax',   # Mitigate CSRF attacks
     SESSION_COOKIE_MAX_AGE=3600,     # Session expires in 1 hour
-    PERMANENT_SESSION_LIFETIME=3600  # Session lifetime in seconds
+    PERMANENT_SESSION_LIFETIME=3600,  # Session lifetime in seconds
+    # Largest request body accepted (413 beyond); the API only takes small JSON forms
+    MAX_CONTENT_LENGTH=int(os.getenv('MAX_CONTENT_LENGTH', 64 * 1024))
 )
 
 
@@ -39,41 +69,194 @@ USE_FALLBACK_ONLY = os.getenv('USE_FALLBACK_ONLY', 'false').lower() == 'true'
 
 API_TIMEOUT = int(os.getenv('API_TIMEOUT', 2))
 
+if traffic_recorder.UPSTREAM_RECORD_DIR:
+    # Record mode: every upstream exchange is captured for bench/replay_backend.py
+    upstream.recorder = traffic_recorder.Recorder()
+
+backend_selector = backends.BackendSelector([FALLBACK_API] if USE_FALLBACK_ONLY else [LOCAL_API, FALLBACK_API])
+alert_hub = AlertHub(backend_selector.primary)
+alert_history = alert_store.AlertStore()
+alert_hub.listeners.append(alert_history.on_stream)
+response_cache = ResponseCache()
+credential_cache = auth_gate.CredentialCache()
+
+
+def fetch_device_status(cookies):
+    # Called from the shared status poller, outside any request context
+    response, server = backend_selector.request(
+        'GET', '/api/devices/status',
+        headers={"Content-Type": "application/json"},
+        cookies=cookies,
+        timeout=API_TIMEOUT
+    )
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()
+
+
+def share_device_status(key, status):
+    # Streamed status, polled here or relayed from the leader worker, also answers
+    # /api/devices/status polls from this worker's cache
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(status).encode('utf-8')
+    response.headers['Content-Type'] = 'application/json'
+    response_cache.put('/api/devices/status', key, (response, None))
+
+
+status_stream_hub = StatusStreamHub(fetch_device_status, on_status=share_device_status)
+
+# Under gunicorn one elected worker holds the upstream alert streams and status
+# polls, and relays them to its siblings over a Unix socket
+worker_relay = None
+if worker_bus.WORKER_BUS:
+    worker_relay = worker_bus.Relay()
+    worker_relay.register('alerts', alert_hub)
+    worker_relay.register('status', status_stream_hub)
+    alert_hub.relay = status_stream_hub.relay = worker_relay
+
+
+# === Metrics ===
+REQUEST_LATENCY = metrics.Histogram('http_request_duration_seconds',
+                                    'Time to build each response (headers only for streams)', ('method', 'route'))
+REQUESTS_TOTAL = metrics.Counter('http_requests_total', 'Requests served', ('method', 'route', 'status'))
+metrics.GaugeFunction('sse_clients', 'Open server-sent event connections', ('stream',),
+                      lambda: {('alerts',): alert_hub.client_count(),
+                               ('device_status',): status_stream_hub.client_count()})
+metrics.GaugeFunction('upstream_pool_idle_connections', 'Idle keep-alive connections per backend', ('backend',),
+                      lambda: {labels: idle for labels, (idle, size) in upstream.pool_stats().items()})
+metrics.GaugeFunction('upstream_pool_max_connections', 'Keep-alive pool capacity per backend', ('backend',),
+                      lambda: {labels: size for labels, (idle, size) in upstream.pool_stats().items()})
+metrics.GaugeFunction('worker_bus_leader', '1 in the worker holding the shared upstream streams', (),
+                      lambda: {(): int(worker_relay is not None and worker_relay.leading)})
+metrics.GaugeFunction('upstream_circuit_open', '1 while a backend circuit is open', ('backend',),
+                      lambda: {(b['url'],): int(b['state'] == backends.OPEN) for b in backend_selector.snapshot()})
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.monotonic()
+    metrics.registry.start_flusher()
+    if worker_relay is not None:
+        worker_relay.start()
+
+
+@app.after_request
+def observe_request(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.observe((request.method, route), time.monotonic() - started)
+        REQUESTS_TOTAL.inc((request.method, route, str(response.status_code)))
+    return response
+
+
+@app.errorhandler(admission.Rejected)
+def admission_rejected(e):
+    response = jsonify({'success': False, 'error': e.message})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, e.status_code
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.exposition(), mimetype='text/plain; version=0.0.4')
+
 
 def get_api_response(endpoint, method='GET', data=None, timeout=API_TIMEOUT):
-    # Try main backend first, then fallback if needed
-    urls = [FALLBACK_API] if USE_FALLBACK_ONLY else [LOCAL_API, FALLBACK_API]
-    for base_url in urls:
-        if not base_url:
-            continue
-        url = f'{base_url}{endpoint}'
-        print(f"🔍 API Request - Method: {method}, URL: {url}")
-        print(f"🔍 API Request - Data: {data}")
-        try:
-            headers = {"Content-Type": "application/json"}
-            req_args = {
-                'url': url,
-                'headers': headers,
-                'cookies': request.cookies,
-                'timeout': timeout
-            }
-            if method == 'GET':
-                response = requests.get(**req_args)
-            elif method == 'POST':
-                req_args['json'] = data
-                response = requests.post(**req_args)
-            elif method == 'PUT':
-                req_args['json'] = data
-                response = requests.put(**req_args)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-
-            print(f"✅ Response status: {response.status_code}")
-            print(f"Response body: {response.text}")
-            return response, base_url
-        except Exception as e:
-            print(f"❌ Request error for {base_url}: {str(e)}")
-    return None, None
+    # Healthiest backend first, falling through to the next on connection errors
+    if method not in ('GET', 'POST', 'PUT'):
+        raise ValueError(f"Unsupported HTTP method: {method}")
+    req_args = {
+        'headers': {"Content-Type": "application/json"},
+        'cookies': request.cookies,
+        'timeout': timeout
+    }
+    if method in ('POST', 'PUT'):
+        req_args['json'] = data
+    start = time.monotonic()
+    with admission.upstream_concurrency.slot(endpoint):
+        response, base_url = backend_selector.request(method, endpoint, **req_args)
+    upstream_log.record(request.path, method, endpoint, base_url,
+                        response.status_code if response is not None else None,
+                        time.monotonic() - start, request_body=data,
+                        response_body=response.content if response is not None else None)
+    return response, base_url
+
+# Headers copied between browser and backend by the passthrough proxy
+PASSTHROUGH_REQUEST_HEADERS = ('Accept', 'Content-Type', 'If-None-Match', 'If-Modified-Since')
+PASSTHROUGH_RESPONSE_HEADERS = ('Content-Type', 'Content-Encoding', 'Content-Length', 'ETag',
+                                'Last-Modified', 'Cache-Control', 'Vary', 'Set-Cookie')
+PASSTHROUGH_CHUNK_SIZE = 64 * 1024
+
+
+def proxy_passthrough(endpoint, method, error_message='server unavailable or error occurred'):
+    # Stream the backend's bytes straight back: no JSON parse/re-serialise, and
+    # compressed bodies stay compressed
+    headers = {name: request.headers[name] for name in PASSTHROUGH_REQUEST_HEADERS if name in request.headers}
+    headers.setdefault('Content-Type', 'application/json')
+    # Only ask for encodings the browser itself accepts
+    headers['Accept-Encoding'] = request.headers.get('Accept-Encoding', 'identity')
+    req_args = {
+        'headers': headers,
+        'cookies': request.cookies,
+        'timeout': API_TIMEOUT,
+        'stream': True
+    }
+    if method in ('POST', 'PUT'):
+        req_args['data'] = request.get_data()
+    start = time.monotonic()
+    with admission.upstream_concurrency.slot(endpoint):
+        resp, server = backend_selector.request(method, endpoint, **req_args)
+    upstream_log.record(request.path, method, endpoint, server,
+                        resp.status_code if resp is not None else None,
+                        time.monotonic() - start, request_body=req_args.get('data'))
+    if resp is None:
+        return jsonify({'error': error_message}), 500
+    forwarded = [(name, value) for name in PASSTHROUGH_RESPONSE_HEADERS
+                 for value in resp.raw.headers.getlist(name)]
+    flask_response = Response(resp.raw.stream(PASSTHROUGH_CHUNK_SIZE, decode_content=False),
+                              status=resp.status_code, headers=forwarded, direct_passthrough=True)
+    flask_response.call_on_close(resp.close)
+    return flask_response
+
+
+def request_credential():
+    """Cache key for the upstream auth cookies on the current request"""
+    return upstream.credential_key(request.cookies, app.config['SESSION_COOKIE_NAME'])
+
+
+def get_cached_api_response(endpoint):
+    # Idempotent GETs are shared per credential for the route's TTL, and
+    # concurrent identical requests wait for a single upstream call.
+    # Credentials not yet validated by the session or the backend bypass the cache.
+    if not g.get('auth_validated'):
+        response, server = get_api_response(endpoint, 'GET')
+        return response, server, 'BYPASS'
+    (response, server), status = response_cache.get_or_fetch(
+        endpoint, request_credential(),
+        lambda: get_api_response(endpoint, 'GET'),
+        cacheable=lambda result: result[0] is not None and result[0].status_code == 200
+    )
+    return response, server, status
+
+
+def cached_json_response(response, cache_status, error_message):
+    if response is None:
+        return jsonify({'error': error_message}), 500
+    # Backend bytes go out as-is, with its status (4xx included); no need to parse and re-serialise them
+    flask_response = Response(response.content,
+                              content_type=response.headers.get('Content-Type', 'application/json'))
+    status_code = response.status_code
+    if status_code == 200:
+        # Pollers revalidate with If-None-Match and get a body-less 304 when nothing changed
+        etag = hashlib.sha1(response.content).hexdigest()
+        if request.if_none_match.contains(etag):
+            flask_response, status_code = Response(), 304
+        flask_response.set_etag(etag)
+    flask_response.headers['Cache-Control'] = 'private, no-cache'
+    flask_response.headers['X-Cache'] = cache_status
+    return flask_response, status_code
 
 # === Session Management Helper ===
 def is_user_logged_in():
@@ -89,6 +272,57 @@ def is_user_logged_in():
     
     return True
 
+
+def forget_credential(credential):
+    # Logout or session expiry: drop the cached auth verdict and responses
+    credential_cache.discard(credential)
+    response_cache.invalidate(credential)
+    alert_history.discard(credential)
+
+
+# Identity reads whose backend status says whether the cookie itself is valid. Other routes
+# fail for their own reasons (a wrong current password, a forbidden device) and teach nothing
+AUTH_VERDICT_ROUTES = ('/api/users/me', '/api/devices/me')
+
+
+def login_required(view):
+    """Reject unauthenticated or expired clients locally instead of asking the backend"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not upstream.auth_cookies(request.cookies, app.config['SESSION_COOKIE_NAME']):
+            return jsonify({'error': 'Not authenticated'}), 401
+        credential = request_credential()
+        if session.get('logged_in') and not is_user_logged_in():
+            forget_credential(credential)
+            return jsonify({'error': 'Session expired'}), 401
+        verdict = credential_cache.verdict(credential)
+        if verdict == auth_gate.REJECTED:
+            return jsonify({'error': 'Not authenticated'}), 401
+        g.auth_validated = verdict == auth_gate.VALID or session.get('logged_in', False)
+        response = app.make_response(view(*args, **kwargs))
+        if verdict is None and request.path in AUTH_VERDICT_ROUTES:
+            credential_cache.record(credential, response.status_code)
+        return response
+    return wrapper
+
+# === Static Assets ===
+# Cache lifetime for static files outside static/js and static/css (images)
+STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', 86400))
+
+# Built at warm-up (or on first use), not at import
+asset_manifest = assets.AssetManifest(os.path.join(app.root_path, 'static'))
+app.jinja_env.globals['asset_url'] = asset_manifest.url
+page_cache = {}
+
+
+def cached_page(template):
+    # The pages don't vary per request, so each is rendered once per worker
+    page = page_cache.get(template)
+    if page is None:
+        page = page_cache[template] = assets.Asset(render_template(template).encode('utf-8'),
+                                                   'text/html; charset=utf-8')
+    return page.response(request)
+
 # === Frontend Pages ===
 @app.route('/')
 def home():
@@ -96,39 +330,106 @@ def home():
 
 @app.route('/login')
 def login_page():
-    return render_template('login.html')
+    return cached_page('login.html')
 
 @app.route('/dashboard')
 def dashboard_page():
-    return render_template('dashboard.html')
+    return cached_page('dashboard.html')
 
 @app.route('/register')
 def register_page():
-    return render_template('register.html')
+    return cached_page('register.html')
 
 @app.route('/static/<path:path>')
 def serve_static(path):
-    return send_from_directory('static', path)
-
-# === Health Check ===
-# Removed: /api/health
+    asset, immutable = asset_manifest.lookup(path)
+    if asset is not None:
+        return asset.response(request, assets.IMMUTABLE if immutable else None)
+    return send_from_directory('static', path, max_age=STATIC_MAX_AGE)
+
+# === Startup Warm-up ===
+PAGES = ('login.html', 'dashboard.html', 'register.html')
+# Keep-alive connections opened to each backend before the worker takes traffic
+WARMUP_CONNECTIONS = int(os.getenv('WARMUP_CONNECTIONS', 2))
+# Seconds to wait for each backend during warm-up; slower ones start with an open circuit
+WARMUP_TIMEOUT = float(os.getenv('WARMUP_TIMEOUT', API_TIMEOUT))
+STARTUP_SECONDS = metrics.Histogram('worker_startup_seconds', 'Time per worker startup phase', ('phase',))
+warmed_up = threading.Event()
+_warm_up_lock = threading.Lock()
+_warm_up_started = False
+
+
+def warm_up():
+    """Per-worker startup, run before serving (gunicorn post_worker_init): build assets,
+    render pages, resolve and connect to the backends and prime their circuit state"""
+    global _warm_up_started
+    with _warm_up_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+    start = time.perf_counter()
+    try:
+        metrics.registry.start_flusher()
+        if worker_relay is not None:
+            worker_relay.start()
+        asset_manifest.build()
+        with app.test_request_context():
+            for template in PAGES:
+                cached_page(template)
+        reachable = backend_selector.warm_up(WARMUP_CONNECTIONS, WARMUP_TIMEOUT)
+    except Exception as e:
+        # Stay unready rather than failing the worker; the next /readyz probe tries again
+        with _warm_up_lock:
+            _warm_up_started = False
+        print(f"❌ Worker {os.getpid()} warm-up failed, retrying on the next /readyz: {e}")
+        return
+    elapsed = time.perf_counter() - start
+    STARTUP_SECONDS.observe(('warmup',), elapsed)
+    warmed_up.set()
+    backends_state = ', '.join(f"{url} {'up' if ok else 'down'}" for url, ok in reachable.items())
+    print(f"🔥 Worker {os.getpid()} warmed up in {elapsed * 1000:.0f} ms ({backends_state or 'backends not checked'})")
+
+
+# === Health Checks ===
+# Neither probe touches the backend; backend state comes from the circuit breaker
+@app.route('/healthz')
+def healthz():
+    # Liveness: the worker is answering requests
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    # Readiness: warm-up is done. Started here if no server hook ran it (e.g. flask run)
+    if not warmed_up.is_set():
+        if not _warm_up_started:
+            threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+        return jsonify({'status': 'warming up'}), 503
+    # Circuit states only: the probe is public, so backend URLs stay out of the body
+    backends_state = dict(zip(('primary', 'fallback'), (b['state'] for b in backend_selector.snapshot())))
+    return jsonify({'status': 'ready', 'backends': backends_state})
 
 # === Authentication ===
 @app.route('/api/auth/login', methods=['POST'])
+@admission.rate_limited('login')
 def proxy_login():
     data = request.json or {}
-    print(f"🔍 Login attempt - Data: {data}")
-    print(f"🔍 Backend URL: {LOCAL_API}/api/auth/login")
     
     try:
-        resp = requests.post(
-            f"{LOCAL_API}/api/auth/login", 
-            json=data,
-            headers={"Content-Type": "application/json"},
-            cookies=request.cookies
-        )
-        print(f"🔍 Express response status: {resp.status_code}")
-        print(f"🔍 Express response body: {resp.text}")
+        start = time.monotonic()
+        with admission.upstream_concurrency.slot('/api/auth/login'):
+            resp, server = backend_selector.request(
+                'POST', '/api/auth/login',
+                json=data,
+                headers={"Content-Type": "application/json"},
+                cookies=request.cookies,
+                timeout=API_TIMEOUT
+            )
+        upstream_log.record(request.path, 'POST', '/api/auth/login', server,
+                            resp.status_code if resp is not None else None,
+                            time.monotonic() - start, request_body=data,
+                            response_body=resp.content if resp is not None else None)
+        if resp is None:
+            raise ConnectionError("no backend reachable")
         
         if resp.status_code == 200:
             # ✅ Forward Set-Cookie header to browser
@@ -141,114 +442,224 @@ def proxy_login():
             session['user_email'] = data.get('email', '').strip()
             session['device_id'] = data.get('device_id', '').strip()
             session['login_time'] = int(time.time())
-            print(f"✅ Login successful for {data.get('email', '')}")
             
             return flask_response, 200
         else:
             logging.info(f"Failed login for {data.get('email', '')} from {request.remote_addr}")
-            print(f"❌ Login failed - Status: {resp.status_code}, Response: {resp.text}")
             return jsonify({"success": False, "error": resp.json().get("error", "Login failed")}), resp.status_code
+    except admission.Rejected:
+        raise
     except Exception as e:
-        print(f"❌ Error during login: {str(e)}")
+        logging.warning(f"Error during login: {str(e)}")
         return jsonify({"success": False, "error": "An error occurred while logging in."}), 500
 
 @app.route('/api/auth/logout', methods=['POST'])
 def auth_logout():
-    # Clear Flask session
+    # Clear Flask session and anything cached for this login
     session.clear()
+    forget_credential(request_credential())
     
     # Forward logout request to backend
-    response, server = get_api_response('/api/auth/logout', 'POST')
-    if response:
-        return jsonify(response.json()), response.status_code
-    else:
-        return jsonify({'error': 'server unavailable or error occurred'}), 500
+    return proxy_passthrough('/api/auth/logout', 'POST')
 
 # === Session Check ===
 # Removed: /api/auth/session
 
 # === User Management ===
 @app.route('/api/users/me', methods=['GET'])
+@login_required
 def users_me():
-    response, server = get_api_response('/api/users/me', 'GET')
-    if response:
-        return jsonify(response.json()), response.status_code
-    else:
-        return jsonify({'error': 'Failed to get user'}), 500
+    response, server, cache_status = get_cached_api_response('/api/users/me')
+    return cached_json_response(response, cache_status, 'Failed to get user')
 
 @app.route('/api/users/profile', methods=['GET'])
 # Removed: /api/users/profile
 
 @app.route('/api/users/email', methods=['PUT'])
+@login_required
 def update_email():
-    response, server = get_api_response('/api/users/email', 'PUT', request.json)
-    if response:
-        return jsonify(response.json()), response.status_code
-    else:
-        return jsonify({'error': 'server unavailable or error occurred'}), 500
+    response = proxy_passthrough('/api/users/email', 'PUT')
+    response_cache.invalidate(request_credential(), ['/api/users/me'])
+    return response
 
 @app.route('/api/users/phone', methods=['PUT'])
+@login_required
 def update_phone():
-    response, server = get_api_response('/api/users/phone', 'PUT', request.json)
-    if response:
-        return jsonify(response.json()), response.status_code
-    else:
-        return jsonify({'error': 'server unavailable or error occurred'}), 500
+    response = proxy_passthrough('/api/users/phone', 'PUT')
+    response_cache.invalidate(request_credential(), ['/api/users/me'])
+    return response
 
 @app.route('/api/users/password', methods=['PUT'])
+@login_required
 def update_password():
-    response, server = get_api_response('/api/users/password', 'PUT', request.json)
-    if response:
-        return jsonify(response.json()), response.status_code
-    else:
-        return jsonify({'error': 'server unavailable or error occurred'}), 500
+    response = proxy_passthrough('/api/users/password', 'PUT')
+    response_cache.invalidate(request_credential())
+    return response
 
 # === Device Management ===
 @app.route('/api/devices/me', methods=['GET'])
+@login_required
 def devices_me():
-    response, server = get_api_response('/api/devices/me', 'GET')
-    if response:
-        return jsonify(response.json()), response.status_code
-    else:
-        return jsonify({'error': 'server unavailable or error occurred'}), 500
+    response, server, cache_status = get_cached_api_response('/api/devices/me')
+    return cached_json_response(response, cache_status, 'server unavailable or error occurred')
 
 @app.route('/api/devices/status', methods=['GET'])
+@login_required
 def devices_status():
-    response, server = get_api_response('/api/devices/status', 'GET')
-    if response:
-        return jsonify(response.json()), response.status_code
-    else:
-        return jsonify({'error': 'server unavailable or error occurred'}), 500
+    response, server, cache_status = get_cached_api_response('/api/devices/status')
+    return cached_json_response(response, cache_status, 'server unavailable or error occurred')
+
+# Off under gunicorn sync workers (see gunicorn.conf.py), where every open stream pins a worker
+STATUS_STREAM = os.getenv('STATUS_STREAM', 'true').lower() == 'true'
+
+@app.route('/api/devices/status/stream', methods=['GET'])
+@login_required
+def devices_status_stream():
+    # Full status once, then only changed fields; one backend poll per credential
+    if not STATUS_STREAM:
+        # 204 tells EventSource not to reconnect; the dashboard polls /api/devices/status instead
+        return Response(status=204)
+    cookies = upstream.auth_cookies(request.cookies, app.config['SESSION_COOKIE_NAME'])
+    return Response(
+        status_stream_hub.stream(request_credential(), cookies),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive'
+        }
+    )
+
+# === Dashboard Bootstrap ===
+# Sections fetched concurrently for the dashboard's first paint
+BOOTSTRAP_SECTIONS = {
+    'user': '/api/users/me',
+    'device': '/api/devices/me',
+    'status': '/api/devices/status',
+    'alerts': '/api/alerts',
+}
+# Seconds the whole bootstrap may take; slower sections are reported as timed out
+BOOTSTRAP_DEADLINE = float(os.getenv('BOOTSTRAP_DEADLINE', API_TIMEOUT + 0.5))
+bootstrap_executor = ThreadPoolExecutor(max_workers=int(os.getenv('BOOTSTRAP_WORKERS', 16)),
+                                        thread_name_prefix='bootstrap')
+
+
+def fetch_bootstrap_section(endpoint):
+    auth_validated = g.get('auth_validated')
+
+    @copy_current_request_context
+    def fetch():
+        g.auth_validated = auth_validated
+        try:
+            response, server, cache_status = get_cached_api_response(endpoint)
+        except admission.Rejected as e:
+            return {'status': e.status_code, 'error': e.message}
+        if response is None:
+            return {'status': 502, 'error': 'server unavailable or error occurred'}
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        if response.status_code >= 400:
+            return {'status': response.status_code, 'error': data}
+        return {'status': response.status_code, 'data': data}
+    return bootstrap_executor.submit(fetch)
+
+
+@app.route('/api/dashboard/bootstrap', methods=['GET'])
+@login_required
+def dashboard_bootstrap():
+    # One round-trip for the first paint: all sections fan out to the backend at once
+    futures = {name: fetch_bootstrap_section(endpoint) for name, endpoint in BOOTSTRAP_SECTIONS.items()}
+    wait(futures.values(), timeout=BOOTSTRAP_DEADLINE)
+    payload = {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            payload[name] = {'status': 504, 'error': 'timed out'}
+        elif future.exception() is not None:
+            payload[name] = {'status': 500, 'error': 'server unavailable or error occurred'}
+        else:
+            payload[name] = future.result()
+    # The user section is an identity read, so its answer also feeds the auth gate
+    credential_cache.record(request_credential(), payload['user']['status'])
+    # Authentication failures apply to the whole dashboard, not one section
+    statuses = {section['status'] for section in payload.values()}
+    if statuses <= {401, 403}:
+        return jsonify(payload), statuses.pop()
+    return jsonify(payload), 200
 
 # === Alerts ===
 @app.route('/api/alerts', methods=['GET'])
+@login_required
 def alerts():
-    response, server = get_api_response('/api/alerts', 'GET')
-    if response:
-        return jsonify(response.json()), response.status_code
-    else:
-        return jsonify({'error': 'Failure to get alerts'}), 500
+    if not {'since', 'cursor', 'limit'} & set(request.args):
+        response, server, cache_status = get_cached_api_response('/api/alerts')
+        if response is not None and response.status_code == 200 and cache_status != 'HIT':
+            store_alerts(response)
+        return cached_json_response(response, cache_status, 'Failure to get alerts')
+
+    # Incremental query: answered from the alert history, going upstream only when it has a gap
+    try:
+        limit = min(max(int(request.args.get('limit', alert_store.DEFAULT_LIMIT)), 1),
+                    alert_store.ALERT_STORE_PER_DEVICE)
+        cursor = request.args.get('cursor')
+        cursor = alert_store.parse_cursor(cursor) if cursor else None
+        since = request.args.get('since')
+        if since:
+            since = alert_store.parse_timestamp(since)
+            if since is None:
+                raise ValueError('invalid since')
+        else:
+            since = None
+    except ValueError:
+        return jsonify({'error': 'Invalid since, cursor or limit'}), 400
+    key = alert_key()
+    result = alert_history.query(key, since, cursor, limit)
+    cache_status = 'STORE'
+    if result is None:
+        # Straight upstream: a cached copy may be up to its TTL old, and the history
+        # would then be marked complete while missing the newest alerts
+        response, server = get_api_response('/api/alerts', 'GET')
+        cache_status = 'MISS'
+        if response is None or response.status_code != 200:
+            return cached_json_response(response, cache_status, 'Failure to get alerts')
+        store_alerts(response)
+        result = alert_history.query(key, since, cursor, limit, require_complete=False) or ([], cursor)
+    alerts_page, next_cursor = result
+    flask_response = jsonify({
+        'alerts': alerts_page,
+        'cursor': alert_store.format_cursor(next_cursor) if next_cursor else None,
+    })
+    flask_response.headers['Cache-Control'] = 'private, no-cache'
+    flask_response.headers['X-Cache'] = cache_status
+    return flask_response
+
+
+def alert_key():
+    """Alert hub/store key for the current credential and device"""
+    return f"{request_credential()}:{session.get('device_id', '')}"
+
+
+def store_alerts(response):
+    try:
+        body = response.json()
+    except ValueError:
+        return
+    alert_history.ingest(alert_key(), alert_store.alerts_from_body(body), synced=True)
 
 @app.route('/api/sse/alerts', methods=['GET'])
+@login_required
 def proxy_sse_alerts():
-    def generate():
-        backend_url = f"{LOCAL_API}/api/sse/alerts"
-        headers = {"Accept": "text/event-stream"}
-        while True:
-            try:
-                with requests.get(backend_url, stream=True, headers=headers, timeout=60) as resp:
-                    for line in resp.iter_lines():
-                        if line:
-                            data = line.decode('utf-8')
-                            if data.startswith('data: '):
-                                yield f"data: {data[6:]}\n\n"
-            except Exception as e:
-                print(f"SSE proxy error: {e}")
-                yield f"data: {{\"error\": \"SSE connection error, retrying...\"}}\n\n"
-                import time
-                time.sleep(5)  # Wait before reconnecting
+    # One shared upstream stream per credential/device, fanned out by the hub
+    cookies = upstream.auth_cookies(request.cookies, app.config['SESSION_COOKIE_NAME'])
+    key = alert_key()
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('lastEventId'))
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
     return Response(
-        generate(),
+        alert_hub.stream(key, cookies, last_event_id),
         mimetype='text/event-stream',
         headers={
             'Cache-Control': 'no-cache',
@@ -260,39 +671,36 @@ def proxy_sse_alerts():
 
 # === Password Resets ===
 @app.route('/api/password-resets/request', methods=['POST'])
+@admission.rate_limited('password-reset')
 def password_reset_request():
-    response, server = get_api_response('/api/password-resets/request', 'POST', request.json)
-    if response:
-        return jsonify(response.json()), response.status_code
-    else:
-        return jsonify({'error': 'error occurred while logging in'}), 500
+    return proxy_passthrough('/api/password-resets/request', 'POST', 'error occurred while logging in')
 
 @app.route('/api/password-resets/reset', methods=['POST'])
+@admission.rate_limited('password-reset')
 def password_reset_reset():
-    response, server = get_api_response('/api/password-resets/reset', 'POST', request.json)
-    if response:
-        return jsonify(response.json()), response.status_code
-    else:
-        return jsonify({'error': 'server unavailable or error occurred'}), 500
+    return proxy_passthrough('/api/password-resets/reset', 'POST')
 
 # === Registration ===
 @app.route('/api/auth/register', methods=['POST'])
 @cross_origin()
+@admission.rate_limited('register')
 def register():
-    response, server = get_api_response('/api/auth/register', 'POST', request.json)
-    if response:
-        return jsonify(response.json()), response.status_code
-    else:
-        return jsonify({'error': 'server unavailable or error occurred'}), 500
+    return proxy_passthrough('/api/auth/register', 'POST')
 
 # # Make ONLINE_CLIENT_RENDER available in all templates
 # @app.context_processor
 # def inject_online_client_render():
 #     return dict(ONLINE_CLIENT_RENDER=ONLINE_CLIENT_RENDER)
 
+STARTUP_SECONDS.observe(('import',), time.perf_counter() - IMPORT_STARTED)
+print(f"📦 App imported in {(time.perf_counter() - IMPORT_STARTED) * 1000:.0f} ms")
+
 # === Run the Server ===
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 10000))
+    # No gunicorn master here to clear the previous run's snapshots
+    metrics.reset_directory()
+    warm_up()
     app.run(debug=False, host='0.0.0.0', port=port)
 
 @app.route('/debug-cookies')
@@ -0,0 +1,124 @@
+"""Static asset pipeline: content-hashed URLs, precompressed variants and cached page bodies.
+
+At startup every file under static/js and static/css is read once, hashed
+and compressed (gzip, plus brotli when the optional `brotli` package is
+installed). Templates link to `asset_url('js/dashboard.js')`, which resolves
+to `/static/js/dashboard.<hash>.js`; those URLs never change content, so
+they are served with a year-long immutable Cache-Control.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone is fine
+    brotli = None
+
+from flask import Response
+
+FINGERPRINTED_DIRS = ('js', 'css')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 512
+
+
+class Asset:
+    """An in-memory response body with its ETag and precompressed variants"""
+
+    def __init__(self, body, content_type, cache_control=REVALIDATE):
+        self.body = body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.etag = self.digest[:16]
+        self.variants = {}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(body)
+
+    def response(self, request, cache_control=None):
+        """Build a Flask response, honouring If-None-Match and Accept-Encoding"""
+        headers = {
+            'Cache-Control': cache_control or self.cache_control,
+            'Vary': 'Accept-Encoding',
+        }
+        if request.if_none_match.contains(self.etag):
+            response = Response(status=304, headers=headers)
+            response.set_etag(self.etag)
+            return response
+        body, encoding = self.body, None
+        for candidate in ('br', 'gzip'):
+            if candidate in self.variants and request.accept_encodings[candidate]:
+                body, encoding = self.variants[candidate], candidate
+                break
+        response = Response(body, content_type=self.content_type, headers=headers)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(self.etag)
+        return response
+
+
+def _content_type(path):
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type in ('application/javascript', 'text/javascript'):
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def fingerprint(path, digest):
+    root, ext = os.path.splitext(path)
+    return f'{root}.{digest[:12]}{ext}'
+
+
+class AssetManifest:
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        # logical path ('js/dashboard.js') -> Asset, and hashed path -> Asset
+        self.assets = {}
+        self.fingerprinted = {}
+        self.urls = {}
+        self.built = False
+        self._lock = threading.Lock()
+
+    def build(self):
+        """Hash and compress every asset; runs once, at worker warm-up or on first use"""
+        if self.built:
+            return self
+        with self._lock:
+            if not self.built:
+                self._build()
+                self.built = True
+        return self
+
+    def _build(self):
+        for directory in FINGERPRINTED_DIRS:
+            base = os.path.join(self.static_dir, directory)
+            for dirpath, _, filenames in os.walk(base):
+                for filename in filenames:
+                    full_path = os.path.join(dirpath, filename)
+                    path = os.path.relpath(full_path, self.static_dir).replace(os.sep, '/')
+                    with open(full_path, 'rb') as f:
+                        asset = Asset(f.read(), _content_type(path))
+                    hashed = fingerprint(path, asset.digest)
+                    self.assets[path] = asset
+                    self.fingerprinted[hashed] = asset
+                    self.urls[path] = f'/static/{hashed}'
+
+    def url(self, path):
+        """Fingerprinted URL for a static path, or the plain URL if it isn't managed"""
+        self.build()
+        return self.urls.get(path, f'/static/{path}')
+
+    def lookup(self, path):
+        """(asset, immutable) for a requested static path, or (None, False)"""
+        self.build()
+        asset = self.fingerprinted.get(path)
+        if asset is not None:
+            return asset, True
+        # Unhashed paths stay valid (e.g. relative ES module imports) but must revalidate
+        return self.assets.get(path), False
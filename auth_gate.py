@@ -0,0 +1,52 @@
+"""Remembers recent backend verdicts on auth cookies so protected routes can answer locally."""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds a cookie the backend accepted is trusted without another round-trip
+AUTH_VALIDATION_WINDOW = float(os.getenv('AUTH_VALIDATION_WINDOW', 300))
+# Seconds a cookie the backend rejected is refused locally
+AUTH_REJECTION_WINDOW = float(os.getenv('AUTH_REJECTION_WINDOW', 30))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 10000))
+
+VALID = 'valid'
+REJECTED = 'rejected'
+
+
+class CredentialCache:
+    def __init__(self, max_entries=AUTH_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verdict(self, credential):
+        """VALID, REJECTED, or None when the backend hasn't been asked recently"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(credential)
+            if entry is None:
+                return None
+            verdict, expires_at = entry
+            if expires_at <= now:
+                del self._entries[credential]
+                return None
+            return verdict
+
+    def record(self, credential, status_code):
+        """Learn from a backend answer: 2xx validates the cookie, 401/403 rejects it"""
+        if 200 <= status_code < 300:
+            self._set(credential, VALID, AUTH_VALIDATION_WINDOW)
+        elif status_code in (401, 403):
+            self._set(credential, REJECTED, AUTH_REJECTION_WINDOW)
+
+    def _set(self, credential, verdict, ttl):
+        with self._lock:
+            self._entries[credential] = (verdict, time.monotonic() + ttl)
+            self._entries.move_to_end(credential)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, credential):
+        with self._lock:
+            self._entries.pop(credential, None)
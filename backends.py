@@ -0,0 +1,275 @@
+"""Health-aware backend selection: rolling stats, circuit breaker and hedged GETs."""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import metrics
+import upstream
+
+# Number of recent calls kept per backend for latency/error statistics
+BACKEND_STATS_WINDOW = int(os.getenv('BACKEND_STATS_WINDOW', 100))
+# Consecutive failures that open a backend's circuit
+BACKEND_FAILURE_THRESHOLD = int(os.getenv('BACKEND_FAILURE_THRESHOLD', 3))
+# Seconds between background probes of an open circuit
+BACKEND_PROBE_INTERVAL = float(os.getenv('BACKEND_PROBE_INTERVAL', 5))
+BACKEND_PROBE_PATH = os.getenv('BACKEND_PROBE_PATH', '/')
+# Send a duplicate GET to the next backend once the primary passes its p95
+BACKEND_HEDGE = os.getenv('BACKEND_HEDGE', 'false').lower() == 'true'
+BACKEND_HEDGE_MIN_DELAY = float(os.getenv('BACKEND_HEDGE_MIN_DELAY', 0.05))
+# Samples needed before the observed p95 is trusted as a hedge delay
+BACKEND_HEDGE_MIN_SAMPLES = 20
+# Hedge delay for GETs sent without a timeout of their own
+API_TIMEOUT = int(os.getenv('API_TIMEOUT', 2))
+
+UPSTREAM_LATENCY = metrics.Histogram('upstream_request_duration_seconds',
+                                     'Backend call latency up to response headers', ('backend', 'endpoint'))
+UPSTREAM_ERRORS = metrics.Counter('upstream_errors_total',
+                                  'Backend calls that failed, timed out or returned 5xx', ('backend', 'kind'))
+UPSTREAM_FALLBACKS = metrics.Counter('upstream_fallbacks_total',
+                                     'Calls answered by a backend other than the configured primary', ('backend',))
+UPSTREAM_HEDGES = metrics.Counter('upstream_hedged_requests_total',
+                                  'Duplicate GETs sent to the next backend', ('backend',))
+
+CLOSED = 'closed'
+OPEN = 'open'
+
+
+class BackendStats:
+    """Rolling latency and error statistics plus circuit state for one backend"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.samples = deque(maxlen=BACKEND_STATS_WINDOW)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+
+    def p95(self):
+        latencies = sorted(latency for latency, ok in self.samples if ok)
+        if len(latencies) < BACKEND_HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[int(len(latencies) * 0.95) - 1]
+
+    def error_rate(self):
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def snapshot(self):
+        return {
+            'url': self.base_url,
+            'state': self.state,
+            'samples': len(self.samples),
+            'error_rate': round(self.error_rate(), 3),
+            'p95': self.p95(),
+        }
+
+
+class BackendSelector:
+    def __init__(self, urls):
+        self.stats = {url: BackendStats(url) for url in urls if url}
+        self.order = list(self.stats)
+        self._lock = threading.Lock()
+        self._prober = None
+        self._executor = None
+
+    # --- selection ---
+    def candidates(self):
+        """Backends in priority order, open circuits skipped unless all are open"""
+        with self._lock:
+            healthy = [url for url in self.order if self.stats[url].state == CLOSED]
+        return healthy or list(self.order)
+
+    def primary(self):
+        candidates = self.candidates()
+        return candidates[0] if candidates else None
+
+    # --- bookkeeping ---
+    def record(self, base_url, latency, ok):
+        with self._lock:
+            stats = self.stats[base_url]
+            stats.samples.append((latency, ok))
+            if ok:
+                stats.consecutive_failures = 0
+                stats.state = CLOSED
+                return
+            stats.consecutive_failures += 1
+            if stats.state == CLOSED and stats.consecutive_failures >= BACKEND_FAILURE_THRESHOLD:
+                stats.state = OPEN
+                stats.opened_at = time.monotonic()
+                print(f"⚠️ Circuit opened for {base_url}")
+        self._ensure_prober()
+
+    def snapshot(self):
+        with self._lock:
+            return [self.stats[url].snapshot() for url in self.order]
+
+    def warm_up(self, connections=1, timeout=BACKEND_PROBE_INTERVAL):
+        """Open `connections` pooled connections to every backend and prime its health.
+
+        A backend that doesn't answer starts with its circuit open, so the first
+        real requests go straight to the next one instead of waiting out a timeout.
+        """
+        if not self.order or connections <= 0:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(self.order) * connections) as pool:
+            futures = [(url, pool.submit(self._warm, url, timeout))
+                       for url in self.order for _ in range(connections)]
+        reachable = {url: False for url in self.order}
+        for url, future in futures:
+            reachable[url] = reachable[url] or future.result()
+        for url, ok in reachable.items():
+            if not ok:
+                with self._lock:
+                    stats = self.stats[url]
+                    if stats.state == CLOSED:
+                        stats.state = OPEN
+                        stats.opened_at = time.monotonic()
+                        print(f"⚠️ Circuit opened for {url} (unreachable at startup)")
+                self._ensure_prober()
+        return reachable
+
+    def _warm(self, base_url, timeout):
+        start = time.monotonic()
+        try:
+            # The body is read in full, so the connection goes back to the pool
+            response = upstream.upstream_request('GET', base_url, BACKEND_PROBE_PATH, timeout=timeout)
+            response.close()
+        except Exception:
+            self.record(base_url, time.monotonic() - start, ok=False)
+            return False
+        # 5xx counts as a failure, as in _send and probe
+        ok = response.status_code < 500
+        self.record(base_url, time.monotonic() - start, ok=ok)
+        return ok
+
+    # --- requests ---
+    def _send(self, base_url, method, endpoint, **kwargs):
+        start = time.monotonic()
+        try:
+            response = upstream.upstream_request(method, base_url, endpoint, **kwargs)
+        except Exception as e:
+            latency = time.monotonic() - start
+            self.record(base_url, latency, ok=False)
+            UPSTREAM_LATENCY.observe((base_url, endpoint), latency)
+            kind = 'timeout' if isinstance(e, requests.exceptions.Timeout) else 'connection'
+            UPSTREAM_ERRORS.inc((base_url, kind))
+            raise
+        latency = time.monotonic() - start
+        self.record(base_url, latency, ok=response.status_code < 500)
+        UPSTREAM_LATENCY.observe((base_url, endpoint), latency)
+        if response.status_code >= 500:
+            UPSTREAM_ERRORS.inc((base_url, 'http_5xx'))
+        return response
+
+    def _answered(self, response, base_url):
+        if base_url != self.order[0]:
+            UPSTREAM_FALLBACKS.inc((base_url,))
+        return response, base_url
+
+    def request(self, method, endpoint, **kwargs):
+        """Send to the best backend, falling through to the next on connection errors.
+
+        Returns (response, base_url) or (None, None) when every backend failed.
+        """
+        candidates = self.candidates()
+        if BACKEND_HEDGE and method == 'GET' and len(candidates) > 1:
+            return self._hedged(candidates, method, endpoint, **kwargs)
+        for base_url in candidates:
+            try:
+                return self._answered(self._send(base_url, method, endpoint, **kwargs), base_url)
+            except Exception as e:
+                print(f"❌ Request error for {base_url}: {str(e)}")
+        return None, None
+
+    def _hedged(self, candidates, method, endpoint, **kwargs):
+        primary, fallback = candidates[0], candidates[1]
+        with self._lock:
+            delay = self.stats[primary].p95()
+        timeout = kwargs.get('timeout') or API_TIMEOUT
+        delay = max(delay, BACKEND_HEDGE_MIN_DELAY) if delay is not None else timeout
+        # The delay runs from when the primary is actually sent, not from when a pool thread frees up
+        deadline = time.monotonic() + delay
+        primary_done = threading.Event()
+
+        def hedge():
+            if primary_done.wait(max(0.0, deadline - time.monotonic())):
+                return None
+            UPSTREAM_HEDGES.inc((fallback,))
+            return self._send(fallback, method, endpoint, **kwargs)
+
+        # Only the hedge uses the shared executor; the primary goes out on the caller's thread
+        hedge_future = self._get_executor().submit(hedge)
+        try:
+            response = self._send(primary, method, endpoint, **kwargs)
+        except Exception as e:
+            primary_done.set()
+            print(f"❌ Request error for {primary}: {str(e)}")
+            try:
+                # Use the hedge if it was already sent, otherwise go to the fallback now
+                response = None if hedge_future.cancel() else hedge_future.result()
+                if response is None:
+                    response = self._send(fallback, method, endpoint, **kwargs)
+            except Exception as e:
+                print(f"❌ Request error for {fallback}: {str(e)}")
+                return None, None
+            return self._answered(response, fallback)
+        primary_done.set()
+        # A hedge already in flight finishes in the background and only feeds stats
+        hedge_future.add_done_callback(_close_response)
+        return self._answered(response, primary)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=upstream.UPSTREAM_POOL_SIZE,
+                                                    thread_name_prefix='hedge')
+            return self._executor
+
+    # --- background probing ---
+    def _ensure_prober(self):
+        with self._lock:
+            if self._prober is not None and self._prober.is_alive():
+                return
+            if not any(s.state == OPEN for s in self.stats.values()):
+                return
+            self._prober = threading.Thread(target=self._probe_loop, name='backend-prober', daemon=True)
+            self._prober.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(BACKEND_PROBE_INTERVAL)
+            with self._lock:
+                open_urls = [url for url in self.order if self.stats[url].state == OPEN]
+            if not open_urls:
+                return
+            for base_url in open_urls:
+                self.probe(base_url)
+
+    def probe(self, base_url):
+        """Any answer below 500 means the backend is healthy again; 5xx counts as a failure, as in _send"""
+        start = time.monotonic()
+        try:
+            response = upstream.upstream_request('GET', base_url, BACKEND_PROBE_PATH, timeout=BACKEND_PROBE_INTERVAL)
+            response.close()
+        except Exception:
+            return False
+        if response.status_code >= 500:
+            return False
+        with self._lock:
+            stats = self.stats[base_url]
+            stats.samples.append((time.monotonic() - start, True))
+            stats.consecutive_failures = 0
+            if stats.state == OPEN:
+                stats.state = CLOSED
+                print(f"✅ Circuit closed for {base_url}")
+        return True
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None and future.result() is not None:
+        future.result().close()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Express backend, for benchmarks and offline testing.
+
+Implements every route in the README table with injectable latency, failures
+and SSE event rate:
+
+    python bench/fake_backend.py --port 5001 --latency 20 --jitter 5 --failure-rate 0.01 --sse-rate 2
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+AUTH_COOKIE = 'token'
+PUBLIC_ROUTES = {'/', '/__stats', '/api/auth/login', '/api/auth/register', '/api/auth/logout',
+                 '/api/password-resets/request', '/api/password-resets/reset'}
+
+
+class BackendState:
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.open_streams = 0
+        self.status = {
+            'motionSensor': 'inactive',
+            'distanceSensor': 2.5,
+            'rfidReader': None,
+            'frontDoor': 'locked',
+            'backDoor': 'locked',
+            'window1': 'locked',
+            'ledLight': 'off',
+        }
+        self.alerts = [self.make_alert(i) for i in range(args.alerts)]
+
+    def make_alert(self, i):
+        return {
+            'id': i,
+            'device_id': 'bench-device',
+            'message': f'Motion detected ({i})',
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        }
+
+    def tick(self):
+        # Flip one field now and then so status deltas have something to carry
+        with self.lock:
+            if random.random() < self.args.status_change_rate:
+                self.status['motionSensor'] = 'active' if self.status['motionSensor'] == 'inactive' else 'inactive'
+            return dict(self.status)
+
+
+def make_handler(state):
+    args = state.args
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *a):
+            pass
+
+        def _delay(self):
+            if args.latency or args.jitter:
+                time.sleep(max(0.0, random.gauss(args.latency, args.jitter)) / 1000)
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get('Content-Length', 0))
+            raw = self.rfile.read(length) if length else b''
+            try:
+                return json.loads(raw or b'{}')
+            except ValueError:
+                return {}
+
+        def _authorised(self):
+            return f'{AUTH_COOKIE}=' in (self.headers.get('Cookie') or '')
+
+        def _handle(self, method):
+            with state.lock:
+                state.requests += 1
+            path = urlsplit(self.path).path
+            body = self._body() if method in ('POST', 'PUT') else None
+            self._delay()
+            if random.random() < args.failure_rate:
+                return self._send_json(503, {'error': 'injected failure'})
+            if path not in PUBLIC_ROUTES and not self._authorised():
+                return self._send_json(401, {'error': 'Not authenticated'})
+            route = ROUTES.get((method, path))
+            if route is None:
+                return self._send_json(404, {'error': 'Not found'})
+            return route(self, body)
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def do_PUT(self):
+            self._handle('PUT')
+
+        # --- routes ---
+        def root(self, body):
+            self._send_json(200, {'ok': True})
+
+        def stats(self, body):
+            with state.lock:
+                self._send_json(200, {'requests': state.requests, 'open_streams': state.open_streams})
+
+        def login(self, body):
+            if not body.get('email') or not body.get('password'):
+                return self._send_json(400, {'error': 'Email and password are required'})
+            token = f"{body['email']}-{random.getrandbits(32):x}"
+            self._send_json(200, {'message': 'Login successful'},
+                            {'Set-Cookie': f'{AUTH_COOKIE}={token}; Path=/; HttpOnly'})
+
+        def logout(self, body):
+            self._send_json(200, {'message': 'Logged out'},
+                            {'Set-Cookie': f'{AUTH_COOKIE}=; Path=/; Max-Age=0'})
+
+        def register(self, body):
+            self._send_json(201, {'message': 'Registered', 'email': body.get('email')})
+
+        def users_me(self, body):
+            self._send_json(200, {'email': 'bench@example.com', 'phone': '+10000000000',
+                                  'device': {'device_id': 'bench-device', 'model': 'HS-1'}})
+
+        def ok(self, body):
+            self._send_json(200, {'message': 'Updated'})
+
+        def devices_me(self, body):
+            self._send_json(200, {'device_id': 'bench-device', 'model': 'HS-1', 'online': True})
+
+        def devices_status(self, body):
+            self._send_json(200, state.tick())
+
+        def alerts(self, body):
+            self._send_json(200, state.alerts)
+
+        def sse_alerts(self, body):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            interval = 1.0 / args.sse_rate if args.sse_rate > 0 else None
+            i = 0
+            with state.lock:
+                state.open_streams += 1
+            try:
+                while True:
+                    if interval is None:
+                        time.sleep(15)
+                        self.wfile.write(b': keepalive\n\n')
+                    else:
+                        time.sleep(interval)
+                        alert = dict(state.make_alert(i), sent_at=time.time())
+                        self.wfile.write(f"id: {i}\ndata: {json.dumps(alert)}\n\n".encode('utf-8'))
+                        i += 1
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                with state.lock:
+                    state.open_streams -= 1
+
+    ROUTES = {
+        ('GET', '/'): Handler.root,
+        ('GET', '/__stats'): Handler.stats,
+        ('POST', '/api/auth/register'): Handler.register,
+        ('POST', '/api/auth/login'): Handler.login,
+        ('POST', '/api/auth/logout'): Handler.logout,
+        ('GET', '/api/users/me'): Handler.users_me,
+        ('PUT', '/api/users/email'): Handler.ok,
+        ('PUT', '/api/users/phone'): Handler.ok,
+        ('PUT', '/api/users/password'): Handler.ok,
+        ('GET', '/api/devices/me'): Handler.devices_me,
+        ('GET', '/api/devices/status'): Handler.devices_status,
+        ('GET', '/api/alerts'): Handler.alerts,
+        ('GET', '/api/sse/alerts'): Handler.sse_alerts,
+        ('POST', '/api/password-resets/request'): Handler.ok,
+        ('POST', '/api/password-resets/reset'): Handler.ok,
+    }
+    return Handler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--latency', type=float, default=0, help='mean response latency in ms')
+    parser.add_argument('--jitter', type=float, default=0, help='latency standard deviation in ms')
+    parser.add_argument('--failure-rate', type=float, default=0, help='fraction of requests answered with 503')
+    parser.add_argument('--sse-rate', type=float, default=1, help='SSE alerts per second per stream (0 = keep-alives only)')
+    parser.add_argument('--alerts', type=int, default=50, help='alerts returned by /api/alerts')
+    parser.add_argument('--status-change-rate', type=float, default=0.1,
+                        help='chance that each status read changes a field')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(BackendState(args)))
+    server.daemon_threads = True
+    print(f"🚀 Fake backend on http://{args.host}:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Stand-in backend that replays upstream traffic captured in record mode
+(UPSTREAM_RECORD_DIR, see traffic_recorder.py), so real latency and payload
+shapes can be profiled and benchmarked offline:
+
+    python bench/replay_backend.py recordings/ --port 5001             # original speed
+    python bench/replay_backend.py recordings/ --port 5001 --speed 4   # 4x faster
+    python bench/replay_backend.py recordings/upstream-123.jsonl --speed 0   # no delays
+
+Each method and path serves its recorded responses in recorded order, cycling
+when they run out. Responses wait for the recorded latency divided by
+--speed. SSE streams replay their chunks at the recorded offsets. Recorded
+connection errors are replayed as dropped connections. Masked Set-Cookie
+values get a fresh random token, so logins work.
+"""
+import argparse
+import base64
+import glob
+import itertools
+import json
+import os
+import secrets
+import socket
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+REDACTED = '[REDACTED]'
+# Set by this server itself rather than replayed
+SKIPPED_HEADERS = {'date', 'server', 'connection', 'keep-alive', 'content-length', 'transfer-encoding'}
+# Shortest time between restarts of a looped SSE stream, so --speed 0 can't busy-loop
+LOOP_MIN_INTERVAL = 1.0
+
+
+class Recording:
+    def __init__(self, record):
+        self.kind = record['type']
+        self.status = record.get('status')
+        self.headers = record.get('headers') or []
+        self.latency = (record.get('latency_ms') or 0) / 1000
+        if 'body_b64' in record:
+            self.body = base64.b64decode(record['body_b64'])
+        else:
+            self.body = (record.get('body') or '').encode('utf-8')
+        # SSE only: [(seconds after open, bytes)] and when the stream ended
+        self.chunks = []
+        self.ended_at = None
+
+
+def recording_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, 'upstream-*.jsonl*')))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def load(paths):
+    """{(method, path): [Recording, ...]} in the order the exchanges started"""
+    records = []
+    for filename in recording_files(paths):
+        with open(filename, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    streams = {}
+    started = []
+    for record in records:
+        kind = record.get('type')
+        if kind in ('exchange', 'error', 'stream'):
+            recording = Recording(record)
+            started.append((record.get('ts', 0), record['method'], urlsplit(record['endpoint']).path, recording))
+            if kind == 'stream':
+                streams[record['id']] = recording
+        elif kind == 'chunk' and record.get('id') in streams:
+            streams[record['id']].chunks.append((record['offset_ms'] / 1000, record['data'].encode('utf-8')))
+        elif kind == 'end' and record.get('id') in streams:
+            streams[record['id']].ended_at = record['offset_ms'] / 1000
+    routes = {}
+    for ts, method, path, recording in sorted(started, key=lambda item: item[0]):
+        routes.setdefault((method, path), []).append(recording)
+    for recording in streams.values():
+        recording.chunks.sort(key=lambda chunk: chunk[0])
+    return routes
+
+
+class ReplayState:
+    def __init__(self, routes, args):
+        self.args = args
+        self.routes = {key: itertools.cycle(recordings) for key, recordings in routes.items()}
+        self.counts = {key: len(recordings) for key, recordings in routes.items()}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.open_streams = 0
+
+    def next(self, method, path):
+        with self.lock:
+            self.requests += 1
+            recordings = self.routes.get((method, path))
+            return next(recordings) if recordings is not None else None
+
+    def wait(self, seconds):
+        if self.args.speed > 0 and seconds > 0:
+            time.sleep(seconds / self.args.speed)
+
+    def wait_until(self, started, offset):
+        """Sleep until `offset` recorded seconds after `started`, scaled by --speed"""
+        if self.args.speed > 0:
+            delay = started + offset / self.args.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *a):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_headers(self, recording, extra=()):
+            self.send_response(recording.status)
+            for name, value in recording.headers:
+                if name.lower() in SKIPPED_HEADERS:
+                    continue
+                if name.lower() == 'set-cookie':
+                    value = value.replace(REDACTED, secrets.token_hex(16))
+                self.send_header(name, value)
+            for name, value in extra:
+                self.send_header(name, value)
+            self.end_headers()
+
+        def _handle(self, method):
+            path = urlsplit(self.path).path
+            length = int(self.headers.get('Content-Length', 0))
+            if length:
+                self.rfile.read(length)
+            if path == '/__stats':
+                with state.lock:
+                    return self._send_json(200, {'requests': state.requests, 'open_streams': state.open_streams,
+                                                 'routes': {f'{m} {p}': n for (m, p), n in state.counts.items()}})
+            recording = state.next(method, path)
+            if recording is None:
+                return self._send_json(404, {'error': f'No recording for {method} {path}'})
+            state.wait(recording.latency)
+            if recording.kind == 'error':
+                # The backend was unreachable when recorded: drop the connection
+                self.close_connection = True
+                try:
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                return
+            if recording.kind == 'stream':
+                return self._replay_stream(recording)
+            self._send_headers(recording, [('Content-Length', str(len(recording.body)))])
+            self.wfile.write(recording.body)
+
+        def _replay_stream(self, recording):
+            self._send_headers(recording, [('Connection', 'close')])
+            self.close_connection = True
+            with state.lock:
+                state.open_streams += 1
+            try:
+                while True:
+                    opened = time.monotonic()
+                    for offset, data in recording.chunks:
+                        state.wait_until(opened, offset)
+                        self.wfile.write(data)
+                        self.wfile.flush()
+                    if not state.args.loop_streams or not recording.chunks:
+                        state.wait_until(opened, recording.ended_at or 0)
+                        return
+                    remaining = opened + LOOP_MIN_INTERVAL - time.monotonic()
+                    if remaining > 0:
+                        time.sleep(remaining)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                with state.lock:
+                    state.open_streams -= 1
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def do_PUT(self):
+            self._handle('PUT')
+
+    return Handler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recordings', nargs='+', help='recording files or UPSTREAM_RECORD_DIR directories')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='playback speed: 2 halves every delay, 0 removes them')
+    parser.add_argument('--loop-streams', action='store_true',
+                        help='restart SSE streams from the beginning instead of closing them when they end '
+                             f'(at most once every {LOOP_MIN_INTERVAL:g} s)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    routes = load(args.recordings)
+    if not routes:
+        raise SystemExit(f"No recordings found in {', '.join(args.recordings)}")
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(ReplayState(routes, args)))
+    server.daemon_threads = True
+    total = sum(len(recordings) for recordings in routes.values())
+    print(f"🚀 Replaying {total} recorded exchanges on http://{args.host}:{args.port} (speed {args.speed}x)",
+          flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
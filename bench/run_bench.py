@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Offline load benchmark for the Flask proxy.
+
+Starts the local fake backend(s), runs the app under gunicorn against them,
+drives it with concurrent clients and reports requests/sec and p50/p99 per
+route. Nothing touches the live Render deployment.
+
+    python bench/run_bench.py                          # every scenario
+    python bench/run_bench.py status-poll --clients 100 --duration 20
+    python bench/run_bench.py sse-fanout --clients 500 --serving-mode async
+    python bench/run_bench.py status-poll --replay recordings/ --replay-speed 2
+
+Scenarios:
+    status-poll   many dashboard tabs polling /api/devices/status
+    sse-fanout    many browsers on /api/sse/alerts, plus profile reads
+    primary-down  BACKEND_URL unreachable, everything served by the fallback
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_BACKEND = os.path.join(ROOT, 'bench', 'fake_backend.py')
+REPLAY_BACKEND = os.path.join(ROOT, 'bench', 'replay_backend.py')
+
+
+# === Process helpers ===
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"nothing listening on port {port} after {timeout}s")
+
+
+def start_backend(port, args):
+    if args.replay:
+        # Recorded production traffic instead of the synthetic backend
+        cmd = [sys.executable, REPLAY_BACKEND, *args.replay, '--port', str(port),
+               '--speed', str(args.replay_speed), '--loop-streams']
+    else:
+        cmd = [sys.executable, FAKE_BACKEND, '--port', str(port),
+               '--latency', str(args.backend_latency), '--jitter', str(args.backend_jitter),
+               '--failure-rate', str(args.failure_rate), '--sse-rate', str(args.sse_rate)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(port)
+    return proc
+
+
+def start_app(port, backend_url, fallback_url, args, workdir):
+    env = dict(os.environ,
+               BACKEND_URL=backend_url,
+               FALLBACK_BACKEND_URL=fallback_url or '',
+               SERVING_MODE=args.serving_mode,
+               WEB_CONCURRENCY=str(args.workers),
+               SESSION_COOKIE_SECURE='false',
+               REQUEST_LOG_PATH=os.path.join(workdir, 'requests.jsonl'),
+               METRICS_DIR=os.path.join(workdir, 'metrics'),
+               WORKER_BUS_DIR=os.path.join(workdir, 'bus'))
+    cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+           '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app']
+    log = open(os.path.join(workdir, 'gunicorn.log'), 'w')
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    wait_for_port(port)
+    return proc
+
+
+def stop(procs):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# === Measurement ===
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def add(self, route, latency, ok):
+        with self.lock:
+            self.latencies[route].append(latency)
+            if not ok:
+                self.errors[route] += 1
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def report(title, results, elapsed, extra=None):
+    print(f"\n📊 {title}")
+    print(f"   {'route':<32} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for route in sorted(results.latencies):
+        values = results.latencies[route]
+        print(f"   {route:<32} {len(values):>9} {results.errors[route]:>7} {len(values) / elapsed:>9.1f} "
+              f"{percentile(values, 0.5) * 1000:>8.1f} {percentile(values, 0.99) * 1000:>8.1f}")
+    for line in extra or []:
+        print(f"   {line}")
+
+
+def timed(results, route, session, method, url, **kwargs):
+    start = time.monotonic()
+    try:
+        resp = session.request(method, url, timeout=10, **kwargs)
+        ok = resp.status_code < 400
+    except requests.RequestException:
+        resp, ok = None, False
+    results.add(route, time.monotonic() - start, ok)
+    return resp
+
+
+_logins = {}
+_logins_lock = threading.Lock()
+
+
+def login(session, base, user):
+    # Clients sharing a user reuse one login, like several tabs of one browser
+    with _logins_lock:
+        cookies = _logins.get((base, user))
+        if cookies is None:
+            resp = requests.post(f'{base}/api/auth/login',
+                                 json={'email': f'bench{user}@example.com', 'password': 'benchmark',
+                                       'device_id': 'bench-device'},
+                                 timeout=10)
+            resp.raise_for_status()
+            cookies = _logins[(base, user)] = resp.cookies.get_dict()
+    session.cookies.update(cookies)
+
+
+def run_clients(count, target):
+    threads = [threading.Thread(target=target, args=(n,), daemon=True) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+# === Scenarios ===
+def scenario_status_poll(base, args, backend_port):
+    """Every client is a dashboard tab revalidating the device status as fast as it can"""
+    results = Results()
+    deadline = time.monotonic() + args.duration
+
+    def client(n):
+        session = requests.Session()
+        login(session, base, n % args.users)
+        etag = None
+        while time.monotonic() < deadline:
+            headers = {'If-None-Match': etag} if etag else {}
+            resp = timed(results, '/api/devices/status', session, 'GET', f'{base}/api/devices/status',
+                         headers=headers)
+            if resp is not None and resp.headers.get('ETag'):
+                etag = resp.headers['ETag']
+
+    started = time.monotonic()
+    for thread in run_clients(args.clients, client):
+        thread.join()
+    backend = requests.get(f'http://127.0.0.1:{backend_port}/__stats').json()
+    report(f"status-poll: {args.clients} clients, {args.users} users", results, time.monotonic() - started,
+           [f"backend requests: {backend['requests']}"])
+
+
+def scenario_sse_fanout(base, args, backend_port):
+    """Many open alert streams; measures delivery delay and profile reads alongside"""
+    results = Results()
+    delays = []
+    delays_lock = threading.Lock()
+    received = [0]
+    deadline = time.monotonic() + args.duration
+
+    def sse_client(n):
+        session = requests.Session()
+        login(session, base, n % args.users)
+        try:
+            with session.get(f'{base}/api/sse/alerts', stream=True, timeout=args.duration + 10) as resp:
+                for line in resp.iter_lines(chunk_size=1):
+                    if time.monotonic() > deadline:
+                        return
+                    if line.startswith(b'data: '):
+                        payload = json.loads(line[6:])
+                        if 'sent_at' in payload:
+                            with delays_lock:
+                                delays.append(time.time() - payload['sent_at'])
+                                received[0] += 1
+        except requests.RequestException:
+            pass
+
+    def reader(n):
+        session = requests.Session()
+        login(session, base, n % args.users)
+        while time.monotonic() < deadline:
+            timed(results, '/api/users/me', session, 'GET', f'{base}/api/users/me')
+            time.sleep(0.05)
+
+    started = time.monotonic()
+    streams = run_clients(args.clients, sse_client)
+    time.sleep(min(2.0, args.duration / 4))
+    backend = requests.get(f'http://127.0.0.1:{backend_port}/__stats').json()
+    for thread in run_clients(4, reader):
+        thread.join()
+    for thread in streams:
+        thread.join(timeout=5)
+    elapsed = time.monotonic() - started
+    report(f"sse-fanout: {args.clients} streams, {args.users} users", results, elapsed, [
+        f"alerts delivered: {received[0]} ({received[0] / elapsed:.1f}/s)",
+        f"delivery delay p50 {percentile(delays, 0.5) * 1000:.1f} ms, p99 {percentile(delays, 0.99) * 1000:.1f} ms",
+        f"upstream SSE streams open: {backend['open_streams']}",
+    ])
+
+
+def scenario_primary_down(base, args, backend_port):
+    """Primary refuses connections; reads and writes must be answered by the fallback"""
+    results = Results()
+    deadline = time.monotonic() + args.duration
+
+    def client(n):
+        session = requests.Session()
+        login(session, base, n % args.users)
+        while time.monotonic() < deadline:
+            timed(results, '/api/users/me', session, 'GET', f'{base}/api/users/me')
+            timed(results, '/api/users/phone', session, 'PUT', f'{base}/api/users/phone',
+                  json={'phone': '+10000000000'})
+
+    started = time.monotonic()
+    for thread in run_clients(args.clients, client):
+        thread.join()
+    report(f"primary-down: {args.clients} clients", results, time.monotonic() - started)
+
+
+SCENARIOS = {
+    'status-poll': scenario_status_poll,
+    'sse-fanout': scenario_sse_fanout,
+    'primary-down': scenario_primary_down,
+}
+
+
+def run(name, args):
+    workdir = tempfile.mkdtemp(prefix=f'bench-{name}-')
+    backend_port, app_port = free_port(), free_port()
+    procs = [start_backend(backend_port, args)]
+    try:
+        backend_url = f'http://127.0.0.1:{backend_port}'
+        if name == 'primary-down':
+            # Nothing listens on the primary port; the fake backend is the fallback
+            procs.append(start_app(app_port, f'http://127.0.0.1:{free_port()}', backend_url, args, workdir))
+        else:
+            procs.append(start_app(app_port, backend_url, None, args, workdir))
+        SCENARIOS[name](f'http://127.0.0.1:{app_port}', args, backend_port)
+    finally:
+        stop(procs)
+    print(f"   logs: {workdir}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help=f"one of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--users', type=int, default=5, help='distinct logins shared by the clients')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per scenario')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--serving-mode', choices=['sync', 'async'], default='async')
+    parser.add_argument('--backend-latency', type=float, default=20, help='fake backend mean latency in ms')
+    parser.add_argument('--backend-jitter', type=float, default=5)
+    parser.add_argument('--failure-rate', type=float, default=0)
+    parser.add_argument('--sse-rate', type=float, default=2, help='fake backend SSE alerts per second')
+    parser.add_argument('--replay', action='append', metavar='PATH',
+                        help='serve recordings (file or UPSTREAM_RECORD_DIR) instead of the fake backend')
+    parser.add_argument('--replay-speed', type=float, default=1.0, help='replay speed multiplier (0 = no delays)')
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    backend = (f"replaying {', '.join(args.replay)} at {args.replay_speed}x" if args.replay
+               else f"backend latency {args.backend_latency}±{args.backend_jitter} ms")
+    print(f"🚀 Benchmark: {args.serving_mode} mode, {args.workers} workers, {backend}")
+    for name in args.scenarios or list(SCENARIOS):
+        run(name, args)
+
+
+if __name__ == '__main__':
+    main()
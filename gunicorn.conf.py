@@ -0,0 +1,46 @@
+"""Gunicorn settings for the dashboard.
+
+SERVING_MODE=sync (default) keeps gunicorn's plain sync workers; the device
+status stream is turned off so dashboards poll instead of pinning a worker.
+SERVING_MODE=async runs cooperative gevent workers: blocking upstream calls
+and open /api/sse/alerts streams yield to other requests instead of pinning
+a whole worker, so one worker can hold thousands of dashboards. The Flask
+routes are unchanged; gevent's monkey-patching makes the pooled requests
+sessions, alert hub threads and queues cooperative.
+"""
+import os
+
+SERVING_MODE = os.getenv('SERVING_MODE', 'sync').lower()
+
+if SERVING_MODE == 'async':
+    worker_class = 'gevent'
+    # Concurrent clients (including open SSE streams) per worker
+    worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 4000))
+    # Many greenlets share one worker, so give each backend a bigger keep-alive pool
+    os.environ.setdefault('UPSTREAM_POOL_SIZE', '100')
+    keepalive = 75
+else:
+    worker_class = 'sync'
+    # A sync worker serves one request at a time, so dashboards poll device status instead of streaming it
+    os.environ.setdefault('STATUS_STREAM', 'false')
+
+# One elected worker holds the upstream alert streams and status polls for all of them
+os.environ.setdefault('WORKER_BUS', 'true')
+
+
+def on_starting(server):
+    # Forget metrics snapshots from the previous run before workers start writing
+    import metrics
+    metrics.reset_directory()
+
+
+def post_worker_init(worker):
+    # Warm up before the worker accepts its first request
+    import app
+    app.warm_up()
+
+
+def worker_exit(server, worker):
+    # Close pooled upstream connections on shutdown
+    import upstream
+    upstream.close_all()
@@ -0,0 +1,24 @@
+"""Identity of this deployment on the host, for scratch directories shared by its workers only.
+
+Two instances on one host (different checkouts, backends, ports or users) get
+different directories, so they never merge each other's metrics or follow
+each other's worker-bus leader.
+"""
+import hashlib
+import os
+import tempfile
+
+_IDENTITY = '|'.join([
+    str(os.getuid()) if hasattr(os, 'getuid') else '',
+    os.path.dirname(os.path.abspath(__file__)),
+    os.getenv('BACKEND_URL', ''),
+    os.getenv('FALLBACK_BACKEND_URL', ''),
+    os.getenv('USE_FALLBACK_ONLY', ''),
+    os.getenv('PORT', ''),
+])
+INSTANCE_ID = hashlib.sha1(_IDENTITY.encode('utf-8')).hexdigest()[:12]
+
+
+def scratch_dir(name):
+    """$TMPDIR/ui-flask-homesec-<name>-<instance id>"""
+    return os.path.join(tempfile.gettempdir(), f'ui-flask-homesec-{name}-{INSTANCE_ID}')
@@ -0,0 +1,267 @@
+"""In-process metrics with Prometheus text output that aggregates across gunicorn workers.
+
+Each worker keeps counters, gauges and fixed-bucket histograms in memory and
+periodically writes a snapshot to METRICS_DIR/<pid>.json. The worker that
+serves /metrics merges every snapshot: counters and histograms are summed
+across all workers (including ones that have exited, so totals never go
+backwards), gauges only across workers that are still alive.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+
+import instance
+
+# Per-instance by default, so deployments sharing a host never add up each other's snapshots
+METRICS_DIR = os.getenv('METRICS_DIR', instance.scratch_dir('metrics'))
+# Seconds between snapshot writes by each worker
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def samples(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class GaugeFunction(_Metric):
+    """Gauge whose samples are read from `func()` -> {labels_tuple: value} at collection time"""
+    kind = 'gauge'
+
+    def __init__(self, name, help, labelnames, func):
+        super().__init__(name, help, labelnames)
+        self.func = func
+
+    def samples(self):
+        try:
+            return [[list(labels), value] for labels, value in self.func().items()]
+        except Exception:
+            return []
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            entry['buckets'][index] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def samples(self):
+        with self._lock:
+            return [[list(labels), {'buckets': list(entry['buckets']), 'sum': entry['sum'], 'count': entry['count']}]
+                    for labels, entry in self._values.items()]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self._flusher = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def snapshot(self):
+        return {
+            metric.name: {
+                'type': metric.kind,
+                'help': metric.help,
+                'labelnames': list(metric.labelnames),
+                'buckets': list(getattr(metric, 'buckets', ())),
+                'samples': metric.samples(),
+            }
+            for metric in self.metrics
+        }
+
+    def write_snapshot(self, directory=METRICS_DIR):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def start_flusher(self):
+        """Write snapshots in the background; safe to call on every request"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            try:
+                self.write_snapshot()
+            except OSError as e:
+                print(f"❌ Metrics snapshot error: {e}")
+            time.sleep(METRICS_FLUSH_INTERVAL)
+
+
+registry = Registry()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def aggregate(directory=METRICS_DIR):
+    """Merge every worker's snapshot into one"""
+    merged = {}
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return merged
+    for filename in names:
+        if not filename.endswith('.json'):
+            continue
+        pid = int(filename[:-5]) if filename[:-5].isdigit() else None
+        try:
+            with open(os.path.join(directory, filename), encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        alive = pid is None or pid == os.getpid() or _pid_alive(pid)
+        for name, family in snapshot.items():
+            if family['type'] == 'gauge' and not alive:
+                continue
+            target = merged.setdefault(name, dict(family, samples={}))
+            for labels, value in family['samples']:
+                key = tuple(labels)
+                if family['type'] == 'histogram':
+                    entry = target['samples'].setdefault(
+                        key, {'buckets': [0] * len(value['buckets']), 'sum': 0.0, 'count': 0})
+                    entry['buckets'] = [a + b for a, b in zip(entry['buckets'], value['buckets'])]
+                    entry['sum'] += value['sum']
+                    entry['count'] += value['count']
+                else:
+                    target['samples'][key] = target['samples'].get(key, 0) + value
+    return merged
+
+
+def quantile(bounds, counts, q):
+    """Estimate a quantile from histogram buckets by linear interpolation"""
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if cumulative + count >= rank and count:
+            lower = bounds[i - 1] if i > 0 else 0.0
+            upper = bounds[i] if i < len(bounds) else bounds[-1]
+            return lower + (upper - lower) * (rank - cumulative) / count
+        cumulative += count
+    return bounds[-1]
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def render(merged):
+    """Prometheus text exposition format (0.0.4)"""
+    lines = []
+    for name in sorted(merged):
+        family = merged[name]
+        names = family['labelnames']
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        if family['type'] != 'histogram':
+            for labels, value in sorted(family['samples'].items()):
+                lines.append(f"{name}{_labels(names, labels)} {value}")
+            continue
+        bounds = family['buckets']
+        quantile_lines = []
+        for labels, entry in sorted(family['samples'].items()):
+            cumulative = 0
+            for bound, count in zip(list(bounds) + ['+Inf'], entry['buckets']):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(names, labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, labels)} {entry['sum']}")
+            lines.append(f"{name}_count{_labels(names, labels)} {entry['count']}")
+            for q in QUANTILES:
+                value = quantile(bounds, entry['buckets'], q)
+                quantile_lines.append(f"{name}_quantile{_labels(names, labels, [('quantile', q)])} {value:.6f}")
+        if quantile_lines:
+            lines.append(f"# HELP {name}_quantile Estimated from {name} buckets")
+            lines.append(f"# TYPE {name}_quantile gauge")
+            lines.extend(quantile_lines)
+    return '\n'.join(lines) + '\n'
+
+
+def exposition():
+    """Write this worker's snapshot, then render the merged view of all workers"""
+    registry.write_snapshot()
+    return render(aggregate())
+
+
+def reset_directory(directory=METRICS_DIR):
+    """Remove snapshots left by a previous server run (gunicorn's on_starting, or `python app.py`)"""
+    if not os.path.isdir(directory):
+        return
+    for filename in os.listdir(directory):
+        if filename.endswith('.json') or filename.endswith('.tmp'):
+            os.remove(os.path.join(directory, filename))
@@ -0,0 +1,169 @@
+"""Structured request logging off the hot path.
+
+Request threads only build a small dict and enqueue it; a background thread
+redacts, serialises and appends the records to a JSONL file. The stdlib
+`logging` output (login_attempts.log) goes through the same kind of queue.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+
+REQUEST_LOG_PATH = os.getenv('REQUEST_LOG_PATH', 'logs/requests.jsonl')
+# Fraction of successful upstream calls recorded; errors are always recorded
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv('REQUEST_LOG_SAMPLE_RATE', 1.0))
+# Include (redacted, truncated) request/response bodies in records
+REQUEST_LOG_BODIES = os.getenv('REQUEST_LOG_BODIES', 'false').lower() == 'true'
+REQUEST_LOG_MAX_BODY = int(os.getenv('REQUEST_LOG_MAX_BODY', 2048))
+# Records waiting for the writer; beyond this new records are dropped
+REQUEST_LOG_QUEUE_SIZE = int(os.getenv('REQUEST_LOG_QUEUE_SIZE', 10000))
+
+REDACTED_FIELDS = {'password', 'currentpassword', 'newpassword', 'confirmpassword',
+                   'token', 'accesstoken', 'refreshtoken', 'cookie', 'set-cookie', 'authorization'}
+REDACTED = '[REDACTED]'
+
+
+def redact(value):
+    """Copy of a JSON-like value with credential fields masked"""
+    if isinstance(value, dict):
+        return {key: REDACTED if str(key).lower() in REDACTED_FIELDS else redact(item)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def _body_for_log(body):
+    if body is None:
+        return None
+    if isinstance(body, (bytes, bytearray)):
+        text = bytes(body[:REQUEST_LOG_MAX_BODY * 4]).decode('utf-8', errors='replace')
+        try:
+            body = json.loads(text)
+        except ValueError:
+            return text[:REQUEST_LOG_MAX_BODY]
+    body = json.dumps(redact(body), default=str)
+    return body[:REQUEST_LOG_MAX_BODY]
+
+
+class JsonlWriter:
+    """Appends records to a JSONL file from one background thread per process.
+
+    write() never blocks: records wait in a bounded queue and are dropped when
+    it is full. A '{pid}' in `path` gives each gunicorn worker its own file.
+    With `max_bytes` set, the file is rotated to .1, .2, ... keeping `backups`.
+    """
+
+    def __init__(self, path, serialise=None, queue_size=REQUEST_LOG_QUEUE_SIZE,
+                 max_bytes=0, backups=0, name='jsonl-writer'):
+        self.path = path
+        self.serialise = serialise or (lambda entry: json.dumps(entry, default=str))
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.name = name
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._writer = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def write(self, entry):
+        self._ensure_writer()
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_writer(self):
+        # Started lazily so each forked gunicorn worker gets its own thread (and file, with {pid})
+        if self._pid == os.getpid() and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._writer.is_alive():
+                return
+            self._pid = os.getpid()
+            self._writer = threading.Thread(target=self._write_loop, name=self.name, daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        path = self.path.replace('{pid}', str(os.getpid()))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        sink = open(path, 'a', encoding='utf-8')
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for entry in batch:
+                sink.write(self.serialise(entry) + '\n')
+            sink.flush()
+            if self.max_bytes and sink.tell() >= self.max_bytes:
+                sink.close()
+                self._rotate(path)
+                sink = open(path, 'a', encoding='utf-8')
+
+    def _rotate(self, path):
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{path}.{n}'):
+                os.replace(f'{path}.{n}', f'{path}.{n + 1}')
+        if self.backups > 0:
+            os.replace(path, f'{path}.1')
+        else:
+            os.remove(path)
+
+
+class RequestLog:
+    def __init__(self, path=REQUEST_LOG_PATH, sample_rate=REQUEST_LOG_SAMPLE_RATE,
+                 log_bodies=REQUEST_LOG_BODIES, queue_size=REQUEST_LOG_QUEUE_SIZE):
+        self.sample_rate = sample_rate
+        self.log_bodies = log_bodies
+        self.writer = JsonlWriter(path, self._serialise, queue_size, name='request-log')
+
+    def record(self, route, method, endpoint, backend, status, latency,
+               request_body=None, response_body=None, **extra):
+        """Enqueue one upstream call; never blocks the calling request"""
+        failed = status is None or status >= 500
+        if not failed and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        entry = {
+            'ts': time.time(),
+            'route': route,
+            'method': method,
+            'endpoint': endpoint,
+            'backend': backend,
+            'status': status,
+            'latency_ms': round(latency * 1000, 2),
+        }
+        entry.update(extra)
+        if self.log_bodies:
+            entry['_bodies'] = (request_body, response_body)
+        self.writer.write(entry)
+
+    def _serialise(self, entry):
+        bodies = entry.pop('_bodies', None)
+        if bodies is not None:
+            request_body, response_body = bodies
+            entry['request_body'] = _body_for_log(request_body)
+            entry['response_body'] = _body_for_log(response_body)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(filename, level=logging.INFO):
+    """Route stdlib logging to `filename` through a queue and a listener thread"""
+    log_queue = queue.Queue(-1)
+    file_handler = logging.FileHandler(filename)
+    file_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    return listener
@@ -0,0 +1,118 @@
+"""Short-lived cache for idempotent GET proxy routes, with request coalescing."""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds each route's responses stay fresh; override with
+# RESPONSE_CACHE_TTLS="/api/devices/status=2,/api/alerts=5"
+DEFAULT_TTLS = {
+    '/api/devices/status': 2.0,
+    '/api/devices/me': 30.0,
+    '/api/users/me': 30.0,
+    '/api/alerts': 5.0,
+}
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+
+
+def parse_ttls(spec, defaults=DEFAULT_TTLS):
+    ttls = dict(defaults)
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        route, _, seconds = item.partition('=')
+        ttls[route.strip()] = float(seconds)
+    return ttls
+
+
+RESPONSE_CACHE_TTLS = parse_ttls(os.getenv('RESPONSE_CACHE_TTLS'))
+
+
+class _Call:
+    """An upstream fetch in flight that other requests for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResponseCache:
+    def __init__(self, ttls=None, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttls = RESPONSE_CACHE_TTLS if ttls is None else ttls
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so fetches started before it aren't stored
+        self._generation = 0
+
+    def ttl(self, route):
+        return self.ttls.get(route, 0)
+
+    def get_or_fetch(self, route, credential, fetch, cacheable=lambda result: True):
+        """Return (result, status) where status is 'HIT', 'MISS' or 'COALESCED'.
+
+        Concurrent callers with the same key share one call to `fetch`.
+        """
+        key = (route, credential)
+        ttl = self.ttl(route)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return result, 'HIT'
+                del self._entries[key]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+            generation = self._generation
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, 'COALESCED'
+
+        try:
+            call.result = fetch()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if (call.error is None and ttl > 0 and generation == self._generation
+                        and cacheable(call.result)):
+                    self._store(key, time.monotonic() + ttl, call.result)
+            call.done.set()
+        return call.result, 'MISS'
+
+    def put(self, route, credential, result):
+        """Store a result obtained elsewhere (e.g. the shared status poller) for the route's TTL"""
+        ttl = self.ttl(route)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._store((route, credential), time.monotonic() + ttl, result)
+
+    def _store(self, key, expires_at, result):
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, credential, routes=None):
+        """Drop cached entries for one credential, optionally only for some routes"""
+        with self._lock:
+            self._generation += 1
+            for key in list(self._entries):
+                route, cached_credential = key
+                if cached_credential == credential and (routes is None or route in routes):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
@@ -1,8 +1,66 @@
+let deviceStatus = {};
+let statusPollTimer = null;
+
 async function fetchDeviceStatuses() {
     try {
+        // The browser revalidates with If-None-Match, so unchanged status costs a 304
         const res = await fetch('/api/devices/status');
         const data = await res.json();
+        deviceStatus = data;
+        renderDeviceStatuses(data);
+    } catch (err) {
+        console.error("Error fetching status:", err);
+    }
+}
+
+function startStatusPolling() {
+    if (statusPollTimer) return;
+    fetchDeviceStatuses();
+    statusPollTimer = setInterval(fetchDeviceStatuses, 3000);
+}
+
+function watchDeviceStatuses() {
+    // Full status once, then only the fields that changed
+    if (!window.EventSource) return startStatusPolling();
+    const source = new EventSource('/api/devices/status/stream');
+    source.addEventListener('snapshot', e => {
+        deviceStatus = JSON.parse(e.data);
+        renderDeviceStatuses(deviceStatus);
+    });
+    source.addEventListener('delta', e => {
+        deviceStatus = { ...deviceStatus, ...JSON.parse(e.data) };
+        renderDeviceStatuses(deviceStatus);
+    });
+    // The server answers 204 when it can't hold streams open (sync workers); that closes the source
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) startStatusPolling();
+    };
+}
 
+async function loadDashboard() {
+    // Profile, device, status and alerts arrive together; each section may fail on its own
+    try {
+        const res = await fetch('/api/dashboard/bootstrap');
+        if (res.status === 401) return signOut();
+        const sections = await res.json();
+        if (sections.status && sections.status.data) {
+            deviceStatus = sections.status.data;
+            renderDeviceStatuses(deviceStatus);
+        }
+        if (sections.user && sections.user.data) {
+            document.getElementById('email').value = sections.user.data.email || '';
+            document.getElementById('phoneNumber').value = sections.user.data.phone || '';
+        }
+        if (sections.alerts && Array.isArray(sections.alerts.data)) {
+            sections.alerts.data.slice().reverse().forEach(alert => addAlert(alert.message));
+        }
+    } catch (err) {
+        console.error("Error loading dashboard:", err);
+    }
+}
+
+function renderDeviceStatuses(data) {
+    try {
         // Motion Sensor
         const motion = document.getElementById('motionSensor');
         const motionText = motion.querySelector('.status-text');
@@ -55,7 +113,7 @@ async function fetchDeviceStatuses() {
         }
 
     } catch (err) {
-        console.error("Error fetching status:", err);
+        console.error("Error rendering status:", err);
     }
 }
 
@@ -134,6 +192,6 @@ function signOut() {
 }
 
 document.addEventListener('DOMContentLoaded', () => {
-    fetchDeviceStatuses();
-    setInterval(fetchDeviceStatuses, 3000);
+    loadDashboard();
+    watchDeviceStatuses();
 }); 
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""Server-push device status: one shared backend poll per credential, field-level deltas to clients."""
+import json
+import os
+import queue
+import threading
+import time
+
+from alert_hub import Subscriber
+
+# Seconds between backend polls for a device with at least one open stream
+STATUS_POLL_INTERVAL = float(os.getenv('STATUS_POLL_INTERVAL', 3))
+# Seconds between keep-alive comments when nothing changed
+STATUS_STREAM_KEEPALIVE = float(os.getenv('STATUS_STREAM_KEEPALIVE', 15))
+
+
+def diff_status(old, new):
+    """Fields of `new` that differ from `old`; removed fields map to None"""
+    delta = {key: value for key, value in new.items() if old.get(key, object()) != value}
+    for key in old.keys() - new.keys():
+        delta[key] = None
+    return delta
+
+
+def format_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+class StatusFeed:
+    """Polls one credential's device status and pushes changes to its subscribers"""
+
+    def __init__(self, hub, key, cookies):
+        self.hub = hub
+        self.key = key
+        self.cookies = cookies
+        self.subscribers = set()
+        self.state = None
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name=f'status-feed-{key[:8]}', daemon=True)
+
+    def add(self, subscriber):
+        with self.lock:
+            if self.state is not None:
+                subscriber.offer(('snapshot', self.state))
+            self.subscribers.add(subscriber)
+
+    def remove(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, event, payload):
+        with self.lock:
+            for subscriber in list(self.subscribers):
+                if not subscriber.offer((event, payload)):
+                    self.subscribers.discard(subscriber)
+
+    def poll(self):
+        try:
+            status = self.hub.fetch(self.cookies)
+        except Exception as e:
+            print(f"❌ Status poll error: {e}")
+            status = None
+        if not isinstance(status, dict):
+            self.publish('unavailable', {'error': 'device status unavailable'})
+            return
+        with self.lock:
+            previous, self.state = self.state, status
+        self.hub.status_updated(self.key, status)
+        if previous is None:
+            self.publish('snapshot', status)
+        else:
+            delta = diff_status(previous, status)
+            if delta:
+                self.publish('delta', delta)
+
+    def _follow(self, relay):
+        """Take snapshots and deltas from the leader worker instead of polling the backend"""
+        subscription = relay.follow('status', self.key, self.cookies, self._relayed)
+        if subscription is None:
+            time.sleep(relay.retry)
+            return
+        try:
+            while self.subscribers and not subscription.lost.wait(1):
+                pass
+        finally:
+            subscription.close()
+
+    def _relayed(self, item):
+        event, payload = item
+        if event in ('snapshot', 'delta'):
+            with self.lock:
+                if event == 'snapshot' or self.state is None:
+                    self.state = payload
+                else:
+                    self.state = {**self.state, **payload}
+                status = self.state
+            self.hub.status_updated(self.key, status)
+        self.publish(event, payload)
+
+    def _run(self):
+        while True:
+            while self.subscribers:
+                relay = self.hub.relay
+                if relay is not None and relay.following():
+                    self._follow(relay)
+                    continue
+                started = time.monotonic()
+                self.poll()
+                time.sleep(max(0.0, STATUS_POLL_INTERVAL - (time.monotonic() - started)))
+            if self.hub.retire(self):
+                return
+
+
+class StatusStreamHub:
+    def __init__(self, fetch, on_status=None):
+        # fetch(cookies) returns the backend's status dict, or None on failure
+        self.fetch = fetch
+        # on_status(key, status) is told about every fresh status, polled or relayed
+        self.on_status = on_status
+        self.feeds = {}
+        self.lock = threading.Lock()
+        # worker_bus.Relay when polling is shared between gunicorn workers
+        self.relay = None
+
+    def status_updated(self, key, status):
+        if self.on_status is not None:
+            try:
+                self.on_status(key, status)
+            except Exception as e:
+                print(f"❌ Status listener error: {e}")
+
+    def subscribe(self, key, cookies, subscriber=None):
+        """Register a client, starting the shared poller for `key` if needed"""
+        if subscriber is None:
+            subscriber = Subscriber()
+        with self.lock:
+            feed = self.feeds.get(key)
+            if feed is None:
+                feed = self.feeds[key] = StatusFeed(self, key, cookies)
+                feed.thread.start()
+            feed.add(subscriber)
+        return feed, subscriber
+
+    def stream(self, key, cookies):
+        """Generator of SSE frames: one full snapshot, then deltas as the status changes"""
+        feed, subscriber = self.subscribe(key, cookies)
+        try:
+            while not subscriber.closed:
+                try:
+                    event, payload = subscriber.queue.get(timeout=STATUS_STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(event, payload)
+        finally:
+            feed.remove(subscriber)
+
+    def retire(self, feed):
+        """Drop a feed with no subscribers; returns False if one joined in the meantime"""
+        with self.lock, feed.lock:
+            if feed.subscribers:
+                return False
+            if self.feeds.get(feed.key) is feed:
+                del self.feeds[feed.key]
+            return True
+
+    def client_count(self):
+        with self.lock:
+            return sum(1 for feed in self.feeds.values() for subscriber in list(feed.subscribers)
+                       if subscriber.local)
@@ -0,0 +1,69 @@
+"""Unit tests for alert_hub resume replay: python -m unittest test_alert_hub"""
+import unittest
+
+import alert_hub
+
+
+class FakeHub:
+    relay = None
+
+    def notify(self, key, event, data=None):
+        pass
+
+
+def drain(subscriber):
+    items = []
+    while not subscriber.queue.empty():
+        items.append(subscriber.queue.get_nowait())
+    return items
+
+
+class ChannelResumeTest(unittest.TestCase):
+    def setUp(self):
+        # The upstream thread is never started; events are published directly
+        self.channel = alert_hub.Channel(FakeHub(), 'credential:device', {})
+        self.first_id = self.channel.next_id
+
+    def publish(self, count):
+        for n in range(count):
+            self.channel.publish(f'{{"n": {n}}}')
+
+    def test_resume_within_queue_replays_every_missed_event(self):
+        self.publish(10)
+        subscriber = alert_hub.Subscriber()
+        self.channel.add(subscriber, last_event_id=self.first_id + 4)
+        items = drain(subscriber)
+        self.assertEqual([event_id for event_id, _ in items], list(range(self.first_id + 5, self.first_id + 10)))
+        self.assertIn(subscriber, self.channel.subscribers)
+
+    def test_resume_beyond_queue_sends_reload_and_newest_events(self):
+        room = alert_hub.ALERT_HUB_CLIENT_QUEUE
+        missed = room + 50
+        self.assertLessEqual(missed, alert_hub.ALERT_HUB_BUFFER)
+        self.publish(missed)
+        subscriber = alert_hub.Subscriber()
+        self.channel.add(subscriber, last_event_id=self.first_id - 1)
+
+        self.assertFalse(subscriber.closed)
+        self.assertIn(subscriber, self.channel.subscribers)
+        items = drain(subscriber)
+        self.assertEqual(len(items), room)
+        self.assertEqual(items[0], (None, alert_hub.RELOAD_EVENT))
+        ids = [event_id for event_id, _ in items[1:]]
+        self.assertEqual(ids, list(range(self.first_id + missed - room + 1, self.first_id + missed)))
+
+        # The same client keeps receiving live events after the replay
+        self.publish(1)
+        self.assertEqual(drain(subscriber)[0][0], self.first_id + missed)
+        self.assertFalse(subscriber.closed)
+
+    def test_closed_subscriber_is_not_added(self):
+        subscriber = alert_hub.Subscriber()
+        subscriber.closed = True
+        self.channel.add(subscriber)
+        self.assertNotIn(subscriber, self.channel.subscribers)
+        self.assertIsNotNone(self.channel.idle_since)
+
+
+if __name__ == '__main__':
+    unittest.main()
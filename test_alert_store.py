@@ -0,0 +1,74 @@
+"""Unit tests for alert_store ordering and cursors: python -m unittest test_alert_store"""
+import unittest
+from unittest import mock
+
+import alert_store
+
+
+def ids(alerts):
+    return [alert['id'] for alert in alerts]
+
+
+class CursorTest(unittest.TestCase):
+    def test_round_trip_keeps_microsecond_timestamps(self):
+        history = alert_store.AlertHistory()
+        for n in range(6):
+            history.add({'id': f'a{n}', 'timestamp': f'2026-01-01T00:00:00.12345{n}Z'})
+        page, cursor = history.query(since=0, limit=3)
+        self.assertEqual(ids(page), ['a0', 'a1', 'a2'])
+        cursor = alert_store.parse_cursor(alert_store.format_cursor(cursor))
+        page, cursor = history.query(cursor=cursor, limit=3)
+        self.assertEqual(ids(page), ['a3', 'a4', 'a5'])
+
+    def test_round_trip_keeps_fallback_timestamps(self):
+        # Alerts without a timestamp are stamped with time.time(), at full precision
+        history = alert_store.AlertHistory()
+        with mock.patch.object(alert_store.time, 'time', side_effect=[1767225600.1234567, 1767225600.1234568]):
+            history.add({'id': 'x', 'message': 'first'})
+            history.add({'id': 'y', 'message': 'second'})
+        page, cursor = history.query(since=0, limit=1)
+        self.assertEqual(ids(page), ['x'])
+        page, _ = history.query(cursor=alert_store.parse_cursor(alert_store.format_cursor(cursor)))
+        self.assertEqual(ids(page), ['y'])
+
+    def test_old_cursor_format_still_parses(self):
+        self.assertEqual(alert_store.parse_cursor('1718000000.000:42'), alert_store.sort_key(1718000000.0, '42'))
+        with self.assertRaises(ValueError):
+            alert_store.parse_cursor('no-separator')
+
+
+class OrderingTest(unittest.TestCase):
+    def test_numeric_ids_sort_numerically_at_equal_timestamps(self):
+        history = alert_store.AlertHistory()
+        for alert_id in (49, 9, 'b', 10, 'a'):
+            history.add({'id': alert_id, 'timestamp': 1767225600})
+        page, cursor = history.query(since=0, limit=2)
+        self.assertEqual(ids(page), [9, 10])
+        page, _ = history.query(cursor=alert_store.parse_cursor(alert_store.format_cursor(cursor)))
+        self.assertEqual(ids(page), [49, 'a', 'b'])
+
+    def test_since_starts_at_the_first_alert_at_or_after_it(self):
+        history = alert_store.AlertHistory()
+        for n in range(5):
+            history.add({'id': n, 'timestamp': 1767225600 + n})
+        page, _ = history.query(since=1767225602)
+        self.assertEqual(ids(page), [2, 3, 4])
+        page, _ = history.query(since=1767225602.5)
+        self.assertEqual(ids(page), [3, 4])
+        page, cursor = history.query(since=1767225700)
+        self.assertEqual(page, [])
+        self.assertEqual(cursor[-1], '4')
+
+    def test_oldest_alerts_are_evicted_per_device(self):
+        history = alert_store.AlertHistory()
+        with mock.patch.object(alert_store, 'ALERT_STORE_PER_DEVICE', 3):
+            for n in range(5):
+                history.add({'id': n, 'timestamp': 1767225600 + n})
+        self.assertEqual(len(history.order), 3)
+        self.assertEqual(sorted(history.by_id), ['2', '3', '4'])
+        page, _ = history.query(since=0)
+        self.assertEqual(ids(page), [2, 3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
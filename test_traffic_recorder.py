@@ -0,0 +1,45 @@
+"""Unit tests for traffic_recorder credential masking: python -m unittest test_traffic_recorder"""
+import io
+import unittest
+
+import requests
+from urllib3 import HTTPResponse
+from urllib3._collections import HTTPHeaderDict
+
+import traffic_recorder
+
+
+def make_response(header_list, body=b'{}'):
+    headers = HTTPHeaderDict()
+    for name, value in header_list:
+        headers.add(name, value)
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = HTTPResponse(body=io.BytesIO(body), headers=headers, status=200, preload_content=False)
+    response.headers = requests.structures.CaseInsensitiveDict(response.raw.headers)
+    return response
+
+
+class ResponseHeadersTest(unittest.TestCase):
+    def test_every_set_cookie_is_masked_and_kept_separate(self):
+        response = make_response([
+            ('Content-Type', 'application/json'),
+            ('Set-Cookie', 'access=AAA-SECRET; Path=/; HttpOnly'),
+            ('Set-Cookie', 'refresh=RRR-SECRET; Path=/; HttpOnly'),
+        ])
+        headers = traffic_recorder.response_headers(response, decoded=True)
+        cookies = [value for name, value in headers if name.lower() == 'set-cookie']
+        self.assertEqual(cookies, ['access=[REDACTED]; Path=/; HttpOnly',
+                                   'refresh=[REDACTED]; Path=/; HttpOnly'])
+        self.assertNotIn('SECRET', repr(headers))
+
+    def test_decoded_bodies_drop_framing_headers(self):
+        response = make_response([('Content-Encoding', 'gzip'), ('Content-Length', '10'),
+                                  ('Content-Type', 'application/json')])
+        self.assertEqual(traffic_recorder.response_headers(response, decoded=True),
+                         [['Content-Type', 'application/json']])
+        self.assertEqual(len(traffic_recorder.response_headers(response, decoded=False)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,248 @@
+"""Record mode: capture every upstream exchange, with timing, for offline replay.
+
+With UPSTREAM_RECORD_DIR set, each worker appends to
+UPSTREAM_RECORD_DIR/upstream-<pid>.jsonl (rotated by size to .1, .2, ...).
+Records are written by request_log.JsonlWriter, like the request log, and
+credentials never reach the disk: Cookie/Authorization headers are dropped,
+cookie values and Set-Cookie values are masked, and JSON bodies go through
+request_log.redact() (compressed passthrough bodies are decoded first, or
+dropped if they can't be). bench/replay_backend.py serves the recordings back.
+
+Record types, one JSON object per line:
+    exchange  a complete request/response: status, headers, body, latency_ms
+    error     the backend couldn't be reached (connection error or timeout)
+    stream    response headers of an SSE stream; its events follow as
+    chunk     bytes received `offset_ms` after the stream opened
+    end       the stream closed
+"""
+import base64
+import codecs
+import itertools
+import json
+import os
+import time
+import zlib
+
+import requests
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from request_log import JsonlWriter, redact
+
+UPSTREAM_RECORD_DIR = os.getenv('UPSTREAM_RECORD_DIR', '')
+# Size at which a worker's recording is rotated, and how many old files are kept
+UPSTREAM_RECORD_MAX_BYTES = int(os.getenv('UPSTREAM_RECORD_MAX_BYTES', 50 * 1024 * 1024))
+UPSTREAM_RECORD_BACKUPS = int(os.getenv('UPSTREAM_RECORD_BACKUPS', 5))
+# Largest response body captured; longer bodies are truncated and flagged
+UPSTREAM_RECORD_MAX_BODY = int(os.getenv('UPSTREAM_RECORD_MAX_BODY', 1024 * 1024))
+UPSTREAM_RECORD_QUEUE_SIZE = int(os.getenv('UPSTREAM_RECORD_QUEUE_SIZE', 10000))
+
+REDACTED = '[REDACTED]'
+DROPPED_REQUEST_HEADERS = {'cookie', 'authorization'}
+# Response bodies are stored decoded, so their original framing headers no longer apply
+DECODED_RESPONSE_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+def mask_set_cookie(value):
+    """'token=abc; Path=/; HttpOnly' -> 'token=[REDACTED]; Path=/; HttpOnly'"""
+    pair, sep, attributes = value.partition(';')
+    name, has_value, cookie_value = pair.partition('=')
+    if has_value and cookie_value.strip():
+        pair = f'{name}={REDACTED}'
+    return pair + sep + attributes
+
+
+def response_headers(resp, decoded):
+    """[[name, value], ...] as received: repeated headers such as Set-Cookie stay one entry each"""
+    # resp.headers joins repeats with ', ', which would hide every cookie after the first from masking
+    raw_headers = resp.raw.headers
+    headers = []
+    for name in raw_headers:
+        if decoded and name.lower() in DECODED_RESPONSE_HEADERS:
+            continue
+        for value in raw_headers.getlist(name):
+            if name.lower() == 'set-cookie':
+                value = mask_set_cookie(value)
+            headers.append([name, value])
+    return headers
+
+
+def encode_body(body):
+    """{'body': text} for UTF-8 (JSON redacted), else {'body_b64': ...}"""
+    if not body:
+        return {}
+    fields = {}
+    if len(body) > UPSTREAM_RECORD_MAX_BODY:
+        body = body[:UPSTREAM_RECORD_MAX_BODY]
+        fields['truncated'] = True
+    try:
+        text = bytes(body).decode('utf-8')
+    except UnicodeDecodeError:
+        fields['body_b64'] = base64.b64encode(bytes(body)).decode('ascii')
+        return fields
+    try:
+        text = json.dumps(redact(json.loads(text)))
+    except ValueError:
+        pass
+    fields['body'] = text
+    return fields
+
+
+def decompress(body, encoding):
+    """`body` decoded from its Content-Encoding, or None if it can't be (unknown coding, truncated)"""
+    encoding = (encoding or 'identity').strip().lower()
+    try:
+        if encoding == 'identity':
+            return bytes(body)
+        if encoding in ('gzip', 'x-gzip'):
+            return zlib.decompress(bytes(body), 16 + zlib.MAX_WBITS)
+        if encoding == 'deflate':
+            try:
+                return zlib.decompress(bytes(body))
+            except zlib.error:
+                return zlib.decompress(bytes(body), -zlib.MAX_WBITS)
+        if encoding == 'br' and brotli is not None:
+            return brotli.decompress(bytes(body))
+    except Exception:
+        return None
+    return None
+
+
+def request_fields(kwargs):
+    headers = {name: value for name, value in (kwargs.get('headers') or {}).items()
+               if name.lower() not in DROPPED_REQUEST_HEADERS}
+    fields = {'headers': headers, 'cookies': sorted(kwargs.get('cookies') or {})}
+    if kwargs.get('json') is not None:
+        fields['body'] = json.dumps(redact(kwargs['json']), default=str)
+    elif kwargs.get('data'):
+        fields.update(encode_body(kwargs['data'] if isinstance(kwargs['data'], bytes)
+                                  else str(kwargs['data']).encode('utf-8')))
+    return fields
+
+
+class Recorder:
+    def __init__(self, directory=UPSTREAM_RECORD_DIR, max_bytes=UPSTREAM_RECORD_MAX_BYTES,
+                 backups=UPSTREAM_RECORD_BACKUPS, queue_size=UPSTREAM_RECORD_QUEUE_SIZE):
+        self.directory = directory
+        self.writer = JsonlWriter(os.path.join(directory, 'upstream-{pid}.jsonl'), queue_size=queue_size,
+                                  max_bytes=max_bytes, backups=backups, name='traffic-recorder')
+        self._stream_ids = itertools.count(1)
+
+    def request(self, session, method, base_url, endpoint, kwargs):
+        """session.request() with the exchange recorded; streamed bodies are recorded as they are read"""
+        entry = {
+            'ts': time.time(),
+            'method': method,
+            'endpoint': endpoint,
+            'backend': base_url,
+            'request': request_fields(kwargs),
+        }
+        start = time.monotonic()
+        try:
+            resp = session.request(method, f'{base_url}{endpoint}', **kwargs)
+        except requests.RequestException as e:
+            entry.update(type='error', error=type(e).__name__,
+                         latency_ms=round((time.monotonic() - start) * 1000, 2))
+            self.write(entry)
+            raise
+        entry.update(status=resp.status_code, latency_ms=round((time.monotonic() - start) * 1000, 2))
+        if not kwargs.get('stream'):
+            entry.update(type='exchange', headers=response_headers(resp, decoded=True))
+            entry.update(encode_body(resp.content))
+            self.write(entry)
+        elif resp.headers.get('Content-Type', '').startswith('text/event-stream'):
+            self._tap_stream(resp, entry)
+        else:
+            self._tap_body(resp, entry)
+        return resp
+
+    def _tap_stream(self, resp, entry):
+        # SSE can stay open for hours: write each chunk as it arrives instead of buffering
+        stream_id = f'{os.getpid()}-{next(self._stream_ids)}'
+        opened = time.monotonic()
+        entry.update(type='stream', id=stream_id, headers=response_headers(resp, decoded=True))
+        self.write(entry)
+
+        # Reads can split a multi-byte character; the decoder holds the partial bytes for the next chunk
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+        def write_chunk(data):
+            if data:
+                self.write({'type': 'chunk', 'id': stream_id,
+                            'offset_ms': round((time.monotonic() - opened) * 1000, 2), 'data': data})
+
+        def on_chunk(chunk):
+            write_chunk(decoder.decode(chunk))
+
+        def on_end():
+            write_chunk(decoder.decode(b'', final=True))
+            self.write({'type': 'end', 'id': stream_id, 'offset_ms': round((time.monotonic() - opened) * 1000, 2)})
+        _tee(resp, on_chunk, on_end)
+
+    def _tap_body(self, resp, entry):
+        # Passthrough reads the raw, possibly compressed bytes: they are decoded here so
+        # JSON bodies can be redacted, and dropped when that isn't possible
+        body = bytearray()
+        entry.update(type='exchange', headers=response_headers(resp, decoded=True))
+
+        def on_chunk(chunk):
+            if len(body) <= UPSTREAM_RECORD_MAX_BODY:
+                body.extend(chunk)
+
+        def on_end():
+            decoded = decompress(body, resp.headers.get('Content-Encoding'))
+            if decoded is None:
+                entry['body_dropped'] = True
+            else:
+                entry.update(encode_body(decoded))
+            self.write(entry)
+        _tee(resp, on_chunk, on_end)
+
+    def write(self, entry):
+        """Enqueue one record; never blocks the caller"""
+        self.writer.write(entry)
+
+
+def _tee(resp, on_chunk, on_end):
+    """Report every chunk read from `resp.raw`, then its end, whichever read API the caller uses"""
+    raw = resp.raw
+    finished = []
+
+    def finish():
+        if not finished:
+            finished.append(True)
+            on_end()
+
+    def tee_read(read):
+        def wrapper(*args, **kwargs):
+            chunk = read(*args, **kwargs)
+            if chunk:
+                on_chunk(chunk)
+            # A body with a Content-Length is done once its last byte is read
+            if not chunk or raw.closed:
+                finish()
+            return chunk
+        return wrapper
+
+    def tee_iter(iterate):
+        def wrapper(*args, **kwargs):
+            for chunk in iterate(*args, **kwargs):
+                if chunk:
+                    on_chunk(chunk)
+                yield chunk
+            finish()
+        return wrapper
+
+    def tee_close(close):
+        def wrapper(*args, **kwargs):
+            finish()
+            return close(*args, **kwargs)
+        return wrapper
+
+    raw.read = tee_read(raw.read)
+    raw.read1 = tee_read(raw.read1)
+    raw.read_chunked = tee_iter(raw.read_chunked)
+    raw.close = tee_close(raw.close)
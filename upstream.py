@@ -0,0 +1,117 @@
+"""Shared upstream HTTP client: one keep-alive connection pool per backend."""
+import hashlib
+import os
+import threading
+import time
+from http import cookiejar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connections kept open per backend in each gunicorn worker
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', 10))
+# Pools unused for this many seconds are closed and rebuilt on next use
+UPSTREAM_IDLE_TIMEOUT = float(os.getenv('UPSTREAM_IDLE_TIMEOUT', 60))
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class _BlockAllCookies(cookiejar.DefaultCookiePolicy):
+    """Never persist upstream cookies on the shared session.
+
+    The pool is shared by every browser hitting this worker, so a
+    Set-Cookie from one user's login must not leak into another user's
+    requests. Cookies are always passed explicitly per request instead.
+    """
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+class _Pool:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.session.cookies.set_policy(_BlockAllCookies())
+        self.session.headers.update({'Connection': 'keep-alive'})
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=UPSTREAM_POOL_SIZE,
+                              pool_block=False,
+                              max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.last_used = time.monotonic()
+
+    def close(self):
+        self.session.close()
+
+
+def get_session(base_url):
+    """Return the pooled session for a backend, evicting idle pools first"""
+    now = time.monotonic()
+    with _pools_lock:
+        _evict_idle(now)
+        pool = _pools.get(base_url)
+        if pool is None:
+            pool = _pools[base_url] = _Pool(base_url)
+        pool.last_used = now
+        return pool.session
+
+
+def _evict_idle(now):
+    for base_url, pool in list(_pools.items()):
+        if now - pool.last_used > UPSTREAM_IDLE_TIMEOUT:
+            del _pools[base_url]
+            pool.close()
+
+
+# traffic_recorder.Recorder while record mode is on
+recorder = None
+
+
+def upstream_request(method, base_url, endpoint, **kwargs):
+    """Send a request to `base_url + endpoint` over that backend's pool"""
+    session = get_session(base_url)
+    if recorder is not None:
+        return recorder.request(session, method, base_url, endpoint, kwargs)
+    return session.request(method, f'{base_url}{endpoint}', **kwargs)
+
+
+def auth_cookies(cookies, session_cookie_name='session'):
+    """The browser's cookies minus Flask's own session cookie"""
+    return {name: value for name, value in cookies.items() if name != session_cookie_name}
+
+
+def credential_key(cookies, session_cookie_name='session'):
+    """Stable, non-reversible key identifying an upstream credential"""
+    items = sorted(auth_cookies(cookies, session_cookie_name).items())
+    digest = hashlib.sha256(repr(items).encode('utf-8')).hexdigest()
+    return digest[:32]
+
+
+def pool_stats():
+    """{(base_url,): (idle_connections, max_connections)} for every open pool"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    stats = {}
+    for pool in pools:
+        idle = 0
+        pools = pool.session.get_adapter(pool.base_url).poolmanager.pools
+        for key in pools.keys():
+            connection_pool = pools.get(key)
+            if connection_pool is not None:
+                idle += sum(1 for conn in list(connection_pool.pool.queue) if conn is not None)
+        stats[(pool.base_url,)] = (idle, UPSTREAM_POOL_SIZE)
+    return stats
+
+
+def close_all():
+    """Close every pooled connection (used on worker shutdown)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,310 @@
+"""Cross-worker relay: one elected gunicorn worker holds the upstream streams and feeds its siblings.
+
+Workers compete for an exclusive flock on WORKER_BUS_DIR/leader.lock; the
+holder listens on WORKER_BUS_DIR/leader.sock (a Unix domain socket). Every
+other worker's alert channels and status feeds subscribe through that socket
+instead of opening their own upstream connection, so adding workers no longer
+multiplies backend streams and polls. The kernel drops the lock when the
+leader exits; followers see the socket close, another worker takes the lock,
+and their channels resubscribe to it. A leader that can't keep serving
+releases the lock itself, and if the directory or socket can't be used at
+all every worker goes back to its own upstream streams.
+
+Messages are newline-delimited JSON:
+    follower -> leader  {"op": "subscribe" | "unsubscribe", "source": ..., "key": ..., "cookies": {...}}
+    leader -> follower  {"op": "event", "source": ..., "key": ..., "item": [...]}
+"""
+import fcntl
+import json
+import os
+import queue
+import socket
+import threading
+import time
+
+import instance
+
+# Share upstream streams between workers; gunicorn.conf.py turns this on
+WORKER_BUS = os.getenv('WORKER_BUS', 'false').lower() == 'true'
+# Per-instance by default: a worker must never follow another deployment's leader (and backend)
+WORKER_BUS_DIR = os.getenv('WORKER_BUS_DIR', instance.scratch_dir('bus'))
+# Seconds between leadership attempts, and before a follower retries the leader
+WORKER_BUS_RETRY = float(os.getenv('WORKER_BUS_RETRY', 1))
+# Messages buffered per connection before a slow peer is disconnected
+WORKER_BUS_QUEUE = int(os.getenv('WORKER_BUS_QUEUE', 10000))
+
+
+class Connection:
+    """A socket with a non-blocking outbox drained by its own writer thread"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.outbox = queue.Queue(maxsize=WORKER_BUS_QUEUE)
+        self.closed = threading.Event()
+        threading.Thread(target=self._write, name='worker-bus-writer', daemon=True).start()
+
+    def send(self, message):
+        """Queue a message; returns False (and drops the connection) if the peer can't keep up"""
+        if self.closed.is_set():
+            return False
+        try:
+            self.outbox.put_nowait(json.dumps(message).encode('utf-8') + b'\n')
+            return True
+        except queue.Full:
+            self.close()
+            return False
+
+    def messages(self):
+        """Yield decoded messages until the peer goes away"""
+        try:
+            with self.sock.makefile('rb') as reader:
+                for line in reader:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except OSError:
+            return
+
+    def _write(self):
+        try:
+            while not self.closed.is_set():
+                data = self.outbox.get()
+                if data is None:
+                    return
+                self.sock.sendall(data)
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        try:
+            self.outbox.put_nowait(None)
+        except queue.Full:
+            pass
+
+
+class RemoteSubscriber:
+    """Stands in for a sibling worker in a hub channel's subscriber set"""
+    local = False
+
+    def __init__(self, connection, source, key):
+        self.connection = connection
+        self.source = source
+        self.key = key
+
+    @property
+    def closed(self):
+        return self.connection.closed.is_set()
+
+    def offer(self, item):
+        return self.connection.send({'op': 'event', 'source': self.source, 'key': self.key, 'item': item})
+
+
+class Subscription:
+    """A follower's interest in one source/key; `lost` is set when the leader goes away"""
+
+    def __init__(self, relay, connection, source, key, sink):
+        self.relay = relay
+        self.connection = connection
+        self.source = source
+        self.key = key
+        self.sink = sink
+        self.lost = threading.Event()
+
+    def close(self):
+        with self.relay.lock:
+            if self.relay.subscriptions.get((self.source, self.key)) is self:
+                del self.relay.subscriptions[(self.source, self.key)]
+        if not self.lost.is_set():
+            self.connection.send({'op': 'unsubscribe', 'source': self.source, 'key': self.key})
+
+
+class Relay:
+    def __init__(self, directory=WORKER_BUS_DIR):
+        self.directory = directory
+        self.lock_path = os.path.join(directory, 'leader.lock')
+        self.socket_path = os.path.join(directory, 'leader.sock')
+        self.retry = WORKER_BUS_RETRY
+        # name -> hub with subscribe(key, cookies, subscriber=...) returning (channel, subscriber)
+        self.sources = {}
+        self.leading = False
+        # False once the bus directory or socket turned out unusable
+        self.available = True
+        self.subscriptions = {}
+        self._followers = set()
+        self.lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._lock_file = None
+
+    def register(self, name, hub):
+        self.sources[name] = hub
+
+    def start(self):
+        """Join the leader election in the background; safe to call on every request"""
+        if self._pid == os.getpid():
+            return
+        with self.lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._elect, name='worker-bus-election', daemon=True).start()
+
+    def following(self):
+        """True if streams for this worker should come from the leader rather than upstream"""
+        return self.available and not self.leading
+
+    # --- leader side ---
+    def _elect(self):
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            lock_file = open(self.lock_path, 'a')
+        except OSError as e:
+            self._give_up(e)
+            return
+        # Leadership lasts as long as this file stays open and locked
+        self._lock_file = lock_file
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                time.sleep(self.retry)
+                continue
+            try:
+                server = self._listen()
+            except OSError as e:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                self._give_up(e)
+                return
+            try:
+                self._serve(server)
+            except Exception as e:
+                print(f"❌ Worker bus leader error: {e}")
+            finally:
+                # Hand leadership on: followers reconnect to whichever worker takes the lock next
+                self.leading = False
+                server.close()
+                for connection in list(self._followers):
+                    connection.close()
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            time.sleep(self.retry)
+
+    def _give_up(self, error):
+        # Without a working bus every worker opens its own upstream streams again
+        self.available = False
+        print(f"❌ Worker bus unavailable, streams stay per worker: {error}")
+
+    def _listen(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(self.socket_path)
+            os.chmod(self.socket_path, 0o600)
+            server.listen(64)
+        except OSError:
+            server.close()
+            raise
+        return server
+
+    def _serve(self, server):
+        self.leading = True
+        print(f"👑 Worker {os.getpid()} now holds the shared upstream streams")
+        while True:
+            try:
+                sock, _ = server.accept()
+            except OSError as e:
+                if server.fileno() < 0:
+                    return
+                # e.g. EMFILE under load: keep leading and try again shortly
+                print(f"❌ Worker bus accept error: {e}")
+                time.sleep(self.retry)
+                continue
+            threading.Thread(target=self._serve_follower, args=(Connection(sock),),
+                             name='worker-bus-follower', daemon=True).start()
+
+    def _serve_follower(self, connection):
+        subscriptions = {}
+        self._followers.add(connection)
+        try:
+            for message in connection.messages():
+                name, key = message.get('source'), message.get('key')
+                source = self.sources.get(name)
+                if source is None or not isinstance(key, str):
+                    continue
+                if message.get('op') == 'subscribe' and (name, key) not in subscriptions:
+                    subscriber = RemoteSubscriber(connection, name, key)
+                    subscriptions[(name, key)] = source.subscribe(key, message.get('cookies') or {},
+                                                                  subscriber=subscriber)
+                elif message.get('op') == 'unsubscribe' and (name, key) in subscriptions:
+                    channel, subscriber = subscriptions.pop((name, key))
+                    channel.remove(subscriber)
+        finally:
+            self._followers.discard(connection)
+            connection.close()
+            for channel, subscriber in subscriptions.values():
+                channel.remove(subscriber)
+
+    # --- follower side ---
+    def follow(self, source, key, cookies, sink):
+        """Subscribe to `source`/`key` on the leader, calling sink(item) per event.
+
+        Returns None when this worker leads (or no leader is reachable yet), so
+        the caller should go upstream itself or try again shortly.
+        """
+        if not self.following():
+            return None
+        connection = self._leader_connection()
+        if connection is None:
+            return None
+        subscription = Subscription(self, connection, source, key, sink)
+        with self.lock:
+            self.subscriptions[(source, key)] = subscription
+        connection.send({'op': 'subscribe', 'source': source, 'key': key, 'cookies': cookies})
+        if connection.closed.is_set():
+            subscription.lost.set()
+        return subscription
+
+    def _leader_connection(self):
+        with self.lock:
+            if self._connection is not None and not self._connection.closed.is_set():
+                return self._connection
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                return None
+            connection = self._connection = Connection(sock)
+        threading.Thread(target=self._read_leader, args=(connection,), name='worker-bus-reader', daemon=True).start()
+        return connection
+
+    def _read_leader(self, connection):
+        try:
+            for message in connection.messages():
+                if message.get('op') != 'event':
+                    continue
+                with self.lock:
+                    subscription = self.subscriptions.get((message.get('source'), message.get('key')))
+                if subscription is None or subscription.connection is not connection:
+                    continue
+                try:
+                    subscription.sink(message.get('item'))
+                except Exception as e:
+                    print(f"Worker bus delivery error: {e}")
+        finally:
+            connection.close()
+            with self.lock:
+                lost = [s for s in self.subscriptions.values() if s.connection is connection]
+            for subscription in lost:
+                subscription.lost.set()